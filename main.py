@@ -32,7 +32,12 @@ def main():
         }
     }
 
-    cherrypy.quickstart(ScheduleCreatorNDInterface.ScheduleCreatorNDInterface(), script_name='/', config=conf)
+    # Keep the seat counts of the most requested departments fresh by polling Class Search every 5 minutes
+    # Class Search pages and the request counts are kept in ./cache, so that the most requested departments can be
+    # downloaded again as soon as the server restarts
+    interface = ScheduleCreatorNDInterface.ScheduleCreatorNDInterface(cacheDirectory=os.path.abspath("./cache"),
+                                                                      refreshInterval=300)
+    cherrypy.quickstart(interface, script_name='/', config=conf)
 
 #Set up cherrypy server
 if __name__ == '__main__':
@@ -0,0 +1,139 @@
+# DepartmentRefresher.py
+# Background thread that keeps the Class Search data of the most requested departments fresh, so that seat counts stay
+# up to date during registration without requests having to wait for Class Search
+
+import json
+import logging
+import os
+import threading
+from src.class_scheduler import Metrics
+
+# DepartmentRefresher
+# This class counts how often the courses of each department are requested, and keeps the most requested departments
+# of every parser up to date from a background thread
+# When it starts, it downloads the most requested departments that aren't cached yet (using the counts saved by the
+# last run), and then polls them again every interval seconds with NDClassSearchParserWithCaching.updateDepartment,
+# which only updates the rows that changed
+# Member variables:
+# getParsers: a function that returns the list of parsers to keep fresh; it is called from the background thread
+# interval: the number of seconds between polls
+# maxDepartments: the number of departments of each term that are kept fresh
+# statePath: an optional path of a JSON file in which the request counts are saved between runs (they are loaded when
+#   the refresher is created)
+class DepartmentRefresher(object):
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.DEBUG)
+
+    # Constructor for DepartmentRefresher
+    def __init__(self, getParsers, interval=300, maxDepartments=20, statePath=None):
+        self.getParsers = getParsers
+        self.interval = interval
+        self.maxDepartments = maxDepartments
+        self.statePath = statePath
+        self.__counts = {}
+        self.__lock = threading.Lock()
+        self.__stopping = threading.Event()
+        self.__thread = None
+        self.__load()
+
+    # Function to count a request for a course in a department for a term
+    def recordRequest(self, term, department):
+        with self.__lock:
+            termCounts = self.__counts.setdefault(term, {})
+            termCounts[department] = termCounts.get(department, 0) + 1
+
+    # Return a list of the most requested departments for a term, most requested first
+    def getPopularDepartments(self, term):
+        with self.__lock:
+            termCounts = dict(self.__counts.get(term, {}))
+        return sorted(termCounts, key=lambda department: (-termCounts[department], department))[:self.maxDepartments]
+
+    # Function to start the background thread
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__stopping.clear()
+        self.__thread = threading.Thread(target=self.__run, name="DepartmentRefresher", daemon=True)
+        self.__thread.start()
+
+    # Function to stop the background thread and save the request counts
+    def stop(self):
+        if self.__thread is None:
+            return
+        self.__stopping.set()
+        self.__thread.join()
+        self.__thread = None
+        self.__save()
+
+    # Function to poll the most requested departments of every parser once
+    # Returns the number of sections that changed
+    def refresh(self):
+        changed = 0
+        for parser in self.getParsers():
+            for department in self.getPopularDepartments(parser.term):
+                if self.__stopping.is_set():
+                    return changed
+                try:
+                    changed += len(parser.updateDepartment(department))
+                except Exception:
+                    DepartmentRefresher.logger.exception("Couldn't refresh the {} department for term {}"
+                                                         .format(department, parser.term))
+        Metrics.increment("refresher.polls")
+        return changed
+
+    # Function to download the most requested departments of every parser that aren't cached yet
+    def prefetch(self):
+        for parser in self.getParsers():
+            for department in self.getPopularDepartments(parser.term):
+                if self.__stopping.is_set():
+                    return
+                try:
+                    parser.prefetchDepartment(department)
+                except Exception:
+                    DepartmentRefresher.logger.exception("Couldn't prefetch the {} department for term {}"
+                                                         .format(department, parser.term))
+
+    # Helper function run by the background thread
+    # An error in one cycle (e.g. while listing the parsers) is logged, and the thread keeps polling
+    def __run(self):
+        try:
+            self.prefetch()
+        except Exception:
+            DepartmentRefresher.logger.exception("Couldn't prefetch the most requested departments")
+        while not self.__stopping.wait(self.interval):
+            DepartmentRefresher.logger.info("Refreshing the most requested departments...")
+            try:
+                self.refresh()
+                self.__save()
+            except Exception:
+                DepartmentRefresher.logger.exception("Couldn't refresh the most requested departments")
+
+    # Helper function to load the request counts saved by an earlier run, if there are any
+    def __load(self):
+        if self.statePath is None or not os.path.exists(self.statePath):
+            return
+        try:
+            with open(self.statePath) as stateFile:
+                counts = json.load(stateFile)
+        except (IOError, ValueError):
+            DepartmentRefresher.logger.exception("Couldn't load the request counts from {}".format(self.statePath))
+            return
+        with self.__lock:
+            for term in counts:
+                termCounts = self.__counts.setdefault(term, {})
+                for department in counts[term]:
+                    termCounts[department] = termCounts.get(department, 0) + counts[term][department]
+
+    # Helper function to save the request counts, replacing the file at once so that it is never left half written
+    def __save(self):
+        if self.statePath is None:
+            return
+        with self.__lock:
+            state = json.dumps(self.__counts)
+        try:
+            with open(self.statePath + ".tmp", "w") as stateFile:
+                stateFile.write(state)
+            os.replace(self.statePath + ".tmp", self.statePath)
+        except IOError:
+            DepartmentRefresher.logger.exception("Couldn't save the request counts to {}".format(self.statePath))
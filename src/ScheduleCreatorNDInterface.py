@@ -1,11 +1,398 @@
 # ScheduleCreatorNDInterface.py
 # Cherrypy interface that defines web controllers for application
 
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import weakref
 import cherrypy
+from src.class_scheduler import ScheduleBuilder, ScheduleResultEncoder, IncrementalScheduleBuilder, \
+    ScheduleConstraints, Metrics
+from src.ScheduleResultCache import ScheduleResultCache
+from src.DepartmentRefresher import DepartmentRefresher
+from src.school_extensions.UniversityOfNotreDame import NDClassSearchParser
 
 class ScheduleCreatorNDInterface(object):
 
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.DEBUG)
+
+    # Number of schedules written to the response in each chunk by the schedules controller
+    schedulesPerChunk = 100
+
+    # Searches with at most this many schedule templates (see ScheduleBuilder.iterScheduleTemplates) have their
+    # templates stored in the result cache; larger searches only store their SectionTable, and the templates of each
+    # page are found again when it is requested
+    maxCachedSchedules = 100000
+
+    # Number of seconds for which the list of terms downloaded from Class Search is used
+    termsTTL = 3600
+
+    # Number of seconds after which the list of terms is downloaded again when downloading it failed
+    termsRetryInterval = 60
+
+    # Constructor for ScheduleCreatorNDInterface
+    # cacheDirectory: an optional directory in which the parsers store Class Search pages between restarts
+    # resultCacheBytes: the approximate amount of memory to use for cached search results
+    # collectMetrics: whether to collect performance metrics (see Metrics), which are shown by the metrics controller
+    # refreshInterval: if given, the most requested departments are polled for changes (e.g. seat counts) every
+    #   refreshInterval seconds by a DepartmentRefresher that runs while the cherrypy engine does; with a
+    #   cacheDirectory, the request counts are saved there, and the most requested departments are downloaded again on
+    #   startup
+    def __init__(self, cacheDirectory=None, resultCacheBytes=64 * 1024 * 1024, collectMetrics=False,
+                 refreshInterval=None):
+        self.cacheDirectory = cacheDirectory
+        self.parsers = {}
+        self.parsersLock = threading.Lock()
+        self.sessionBuilders = weakref.WeakSet()
+        self.__terms = (None, 0)
+        self.termsLock = threading.Lock()
+        self.resultCache = ScheduleResultCache(resultCacheBytes)
+        if collectMetrics:
+            Metrics.enable()
+
+        self.refresher = None
+        if refreshInterval:
+            statePath = None
+            if cacheDirectory:
+                os.makedirs(cacheDirectory, exist_ok=True)
+                statePath = os.path.join(cacheDirectory, "departmentRequests.json")
+            self.refresher = DepartmentRefresher(self.__getParsers, refreshInterval, statePath=statePath)
+            cherrypy.engine.subscribe('start', self.refresher.start)
+            cherrypy.engine.subscribe('stop', self.refresher.stop)
+
     # Controller to return index page of application
     @cherrypy.expose
     def index(self):
-        return "Hello World!"
\ No newline at end of file
+        return "Hello World!"
+
+    # Controller to search for the schedules that can be built from a list of courses
+    # courses: course numbers separated by commas (e.g. CSE30331,MATH20550), or the courses parameter given repeatedly
+    # term: the Class Search term to use, defaulting to the most recent term
+    # offset, limit: the position of the first schedule to return, and the maximum number of schedules to return
+    # openOnly: if true (1, true, yes or on), only sections with open seats are used
+    # excludeProf: the name of a professor whose sections aren't used; may be given repeatedly
+    # crns: CRNs separated by commas of sections that must be in every schedule, or the crns parameter given repeatedly
+    # noClassesBefore, noClassesAfter: times (e.g. 10:00 or 17:30) outside of which no class may meet on weekdays
+    # daysOff: the letters of days on which no class may meet (e.g. F)
+    # The response is a JSON object streamed in chunks, with a "schedules" list, a "sections" list and an "errors" list
+    # Each schedule is a list of positions in the sections list, so a section shared by many schedules is only sent once
+    # Search results are shared between requests through the result cache, so paging through the schedules of a set of
+    # courses (in any order) only searches once
+    # Schedules that only differ in interchangeable sections (e.g. sections of a lecture meeting at the same time) are
+    # listed next to each other
+    @cherrypy.expose
+    def schedules(self, courses="", term=None, offset="0", limit=None, openOnly=None, excludeProf=None, crns="",
+                  noClassesBefore=None, noClassesAfter=None, daysOff=""):
+        courseNumberList = ScheduleCreatorNDInterface.__parseCourses(courses)
+        offset, limit = ScheduleCreatorNDInterface.__parsePage(offset, limit)
+        constraints = ScheduleCreatorNDInterface.__parseConstraints(openOnly, excludeProf, crns, noClassesBefore,
+                                                                    noClassesAfter, daysOff)
+        if not courseNumberList:
+            raise cherrypy.HTTPError(400, "No courses given")
+
+        parser = self.getParser(term)
+        courseNumberList = sorted(set(course.replace(" ", "").upper() for course in courseNumberList))
+        request = Metrics.startRequest("schedules {} {}".format(parser.term, ",".join(courseNumberList)))
+        try:
+            with Metrics.timer("request.search"):
+                result = self.resultCache.get((parser.term, tuple(courseNumberList), constraints.getKey()),
+                                              lambda: ScheduleCreatorNDInterface.__search(parser, courseNumberList,
+                                                                                          constraints))
+        finally:
+            Metrics.finishRequest(request)
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        sectionTable, templates, errorsList = result
+        # Only the courses that were found are counted, so that mistyped courses can't make the refresher poll
+        # departments that don't exist
+        foundCourses = set(section.courseNum for section in sectionTable.sections)
+        self.__recordRequest(parser, [course for course in courseNumberList if course in foundCourses])
+        if templates is None:
+            templates = ScheduleBuilder.iterScheduleTemplates(sectionTable)
+        indices = itertools.islice(ScheduleBuilder.expandTemplates(templates, offset), limit)
+        return ScheduleCreatorNDInterface.__streamSchedules(sectionTable, indices, errorsList, offset)
+    schedules._cp_config = {'response.stream': True}
+
+    # Controller to add a course to the list of courses kept in the user's session for a term
+    # The schedules for the list are updated from the previous ones rather than searched for again (see
+    # IncrementalScheduleBuilder)
+    # Returns a JSON object with the "courses" in the list, the number of "schedules" and the "errors" from the course
+    @cherrypy.expose
+    def addCourse(self, course="", term=None):
+        if not course.strip():
+            raise cherrypy.HTTPError(400, "No course given")
+        builder = self.getSessionBuilder(term)
+        errorsList = builder.addCourse(course.strip())
+        if not errorsList:
+            self.__recordRequest(builder.parser, [course.strip()])
+        return ScheduleCreatorNDInterface.__describeBuilder(builder, errorsList)
+
+    # Controller to remove a course from the list of courses kept in the user's session for a term
+    # Returns a JSON object like addCourse
+    @cherrypy.expose
+    def removeCourse(self, course="", term=None):
+        builder = self.getSessionBuilder(term)
+        errorsList = [] if builder.removeCourse(course) else ["Course {} is not in the list".format(course.strip())]
+        return ScheduleCreatorNDInterface.__describeBuilder(builder, errorsList)
+
+    # Controller to return the schedules for the list of courses kept in the user's session for a term
+    # offset and limit are as in the schedules controller, and the response has the same format
+    @cherrypy.expose
+    def sessionSchedules(self, term=None, offset="0", limit=None):
+        offset, limit = ScheduleCreatorNDInterface.__parsePage(offset, limit)
+        builder = self.getSessionBuilder(term)
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        end = offset + limit if limit is not None else None
+        indices = itertools.islice(builder.iterCompactSchedules(), offset, end)
+        return ScheduleCreatorNDInterface.__streamSchedules(builder.sectionTable, indices, [], offset)
+    sessionSchedules._cp_config = {'response.stream': True}
+
+    # Controller to return the performance metrics collected by the server as JSON
+    # Metrics are only collected when the interface was created with collectMetrics, but the result cache statistics
+    # are always included
+    @cherrypy.expose
+    def metrics(self):
+        report = Metrics.getMetrics()
+        report["resultCache"] = dict(hits=self.resultCache.hits, misses=self.resultCache.misses,
+                                     size=self.resultCache.size())
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return json.dumps(report).encode()
+
+    # Return the parser for a term (the most recent term if term is None), creating it the first time the term is
+    # requested
+    # Parsers are shared between requests so that their caches are too, and are keyed by the term they are for
+    # The parser for a term that was requested before is returned without checking the list of terms
+    # Raises a 400 error if the term isn't listed on Class Search
+    def getParser(self, term=None):
+        if term is not None:
+            with self.parsersLock:
+                if term in self.parsers:
+                    return self.parsers[term]
+
+        terms = self.__getTerms()
+        if term is None:
+            term = terms[0]
+        elif term not in terms:
+            raise cherrypy.HTTPError(400, "Unknown term {}".format(term))
+
+        with self.parsersLock:
+            if term in self.parsers:
+                return self.parsers[term]
+        return self.__addParser(term)
+
+    # Helper function to create a parser for a term (the most recent term if term is None, which downloads the list of
+    # terms to find it) and add it to parsers, unless another request added one for the term first
+    # Returns the parser for the term
+    def __addParser(self, term):
+        parser = NDClassSearchParser.NDClassSearchParserWithCaching(term=term, cacheDirectory=self.cacheDirectory)
+        with self.parsersLock:
+            if parser.term not in self.parsers:
+                parser.refreshListeners.append(self.resultCache.invalidateDepartment)
+                parser.refreshListeners.append(self.__sessionSectionsChanged)
+                self.parsers[parser.term] = parser
+            return self.parsers[parser.term]
+
+    # Helper function to return the terms listed on Class Search, most recent first
+    # The list is downloaded the first time it is needed; when the server has a refresher, the refresher thread
+    # downloads it again once it is older than termsTTL (see __getParsers), so requests don't wait on Class Search, and
+    # otherwise the request that finds it out of date does
+    def __getTerms(self):
+        terms, expires = self.__terms
+        if terms is not None and (self.refresher is not None or time.time() < expires):
+            return terms
+        return self.__refreshTerms()
+
+    # Helper function to download the list of terms again if it is out of date, and return it
+    # Only one thread downloads the list at a time; the others keep using the last list meanwhile, and only wait if
+    # there isn't one yet
+    # If the download fails, the last list is kept and the download is tried again after termsRetryInterval
+    # Raises a 503 error if the list has never been downloaded and can't be
+    def __refreshTerms(self):
+        terms, expires = self.__terms
+        if not self.termsLock.acquire(blocking=terms is None):
+            return terms
+        try:
+            terms, expires = self.__terms
+            if terms is not None and time.time() < expires:
+                return terms
+            try:
+                terms = self.__downloadTerms()
+            except Exception:
+                ScheduleCreatorNDInterface.logger.exception("Couldn't download the list of terms from Class Search")
+                if terms is None:
+                    raise cherrypy.HTTPError(503, "Class Search is unavailable")
+                self.__terms = (terms, time.time() + ScheduleCreatorNDInterface.termsRetryInterval)
+                return terms
+            self.__terms = (terms, time.time() + ScheduleCreatorNDInterface.termsTTL)
+            return terms
+        finally:
+            self.termsLock.release()
+
+    # Helper function to download the list of terms through the pooled session of a parser
+    # If there are no parsers yet, the parser for the most recent term is created first
+    def __downloadTerms(self):
+        with self.parsersLock:
+            parser = next(iter(self.parsers.values()), None)
+        if parser is None:
+            parser = self.__addParser(None)
+        return parser.getTerms()
+
+    # Helper function to return every parser, creating the parser for the most recent term if there isn't one yet
+    # It is called from the refresher thread, which also keeps the list of terms up to date
+    def __getParsers(self):
+        self.__refreshTerms()
+        self.getParser()
+        with self.parsersLock:
+            return list(self.parsers.values())
+
+    # Helper function to count a request for courses, so that the refresher knows which departments are popular
+    def __recordRequest(self, parser, courseNumberList):
+        if self.refresher is None:
+            return
+        for course in courseNumberList:
+            try:
+                self.refresher.recordRequest(parser.term, NDClassSearchParser.NDClassSearchParser.getDepartment(course))
+            except ValueError:
+                pass
+
+    # Return the IncrementalScheduleBuilder for a term in the current user's session, creating it if needed
+    def getSessionBuilder(self, term=None):
+        parser = self.getParser(term)
+        builders = cherrypy.session.get('builders')
+        if builders is None:
+            builders = cherrypy.session['builders'] = {}
+        if parser.term not in builders:
+            builders[parser.term] = IncrementalScheduleBuilder(parser)
+            with self.parsersLock:
+                self.sessionBuilders.add(builders[parser.term])
+        return builders[parser.term]
+
+    # Helper function called by a parser when a department of a term is refreshed
+    # The sections in the tables of session builders are updated with the new seat counts, and their cached JSON is
+    # dropped
+    def __sessionSectionsChanged(self, term, department):
+        with self.parsersLock:
+            builders = list(self.sessionBuilders)
+        for builder in builders:
+            if builder.parser.term == term:
+                builder.parser.updateSeatCounts(builder.sectionTable.sections, department)
+                builder.sectionsChanged()
+
+    # Helper function to convert the offset and limit parameters of a request to integers
+    # Raises a 400 error if they aren't valid
+    @staticmethod
+    def __parsePage(offset, limit):
+        try:
+            offset = int(offset)
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            raise cherrypy.HTTPError(400, "offset and limit must be integers")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise cherrypy.HTTPError(400, "offset and limit must not be negative")
+        return (offset, limit)
+
+    # Helper function to return the JSON response describing the state of an IncrementalScheduleBuilder
+    @staticmethod
+    def __describeBuilder(builder, errorsList):
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return json.dumps(dict(courses=builder.courseNums, schedules=builder.count(), errors=errorsList)).encode()
+
+    # Helper function to build the ScheduleConstraints for the constraint parameters of the schedules controller
+    # crns and excludeProf may be given repeatedly; the other parameters may only be given once
+    # Raises a 400 error if a parameter is given more than once when it can't be, if openOnly isn't a boolean, or if a
+    # time isn't in the HH:MM format
+    @staticmethod
+    def __parseConstraints(openOnly, excludeProf, crns, noClassesBefore, noClassesAfter, daysOff):
+        for (name, value) in [("openOnly", openOnly), ("noClassesBefore", noClassesBefore),
+                              ("noClassesAfter", noClassesAfter), ("daysOff", daysOff)]:
+            if isinstance(value, list):
+                raise cherrypy.HTTPError(400, "{} must only be given once".format(name))
+        if isinstance(excludeProf, str):
+            excludeProf = [excludeProf]
+        if isinstance(crns, str):
+            crns = [crns]
+
+        openOnly = (openOnly or "false").strip().lower()
+        if openOnly not in ScheduleCreatorNDInterface.__booleanValues:
+            raise cherrypy.HTTPError(400, "openOnly must be true or false")
+        constraints = ScheduleConstraints(openSeatsOnly=ScheduleCreatorNDInterface.__booleanValues[openOnly],
+                                          excludedProfs=[prof for prof in (excludeProf or []) if prof.strip()],
+                                          requiredCrns=[crn for value in crns for crn in value.split(",")
+                                                        if crn.strip()])
+        try:
+            if noClassesBefore:
+                constraints.blockBefore(*ScheduleCreatorNDInterface.__parseTime(noClassesBefore), days="MTWRF")
+            if noClassesAfter:
+                constraints.blockAfter(*ScheduleCreatorNDInterface.__parseTime(noClassesAfter), days="MTWRF")
+        except ValueError:
+            raise cherrypy.HTTPError(400, "noClassesBefore and noClassesAfter must be times like 10:00")
+        if daysOff:
+            constraints.blockDays(daysOff)
+        return constraints
+
+    # Values accepted for boolean parameters
+    __booleanValues = {"1": True, "true": True, "yes": True, "on": True,
+                       "0": False, "false": False, "no": False, "off": False}
+
+    # Helper function to convert a time like 10:30 to a tuple of the hour and minute
+    # Raises a ValueError if the time isn't valid
+    @staticmethod
+    def __parseTime(timeString):
+        hour, minute = (int(part) for part in timeString.split(":"))
+        if not (0 <= hour <= 24 and 0 <= minute < 60):
+            raise ValueError("Invalid time {}".format(timeString))
+        return (hour, minute)
+
+    # Helper function to split the courses parameter of a request into a list of course numbers
+    @staticmethod
+    def __parseCourses(courses):
+        if isinstance(courses, str):
+            courses = [courses]
+        courseNumberList = []
+        for value in courses:
+            courseNumberList.extend(course.strip() for course in value.split(",") if course.strip())
+        return courseNumberList
+
+    # Helper function to run a search for the result cache
+    # Returns a tuple of the result (a SectionTable, its schedule templates or None if there are too many to store, and
+    # the list of errors) and the set of (term, department) tuples the result depends on
+    @staticmethod
+    def __search(parser, courseNumberList, constraints):
+        errorsList = []
+        sectionTable = ScheduleBuilder.buildSectionTable(parser, courseNumberList, errorsList, constraints)
+        # The number of schedules is a cheap upper bound on the number of templates, so templates are only built when
+        # they're sure to fit in the cache
+        templates = None
+        if ScheduleBuilder.countCompactSchedules(sectionTable) <= ScheduleCreatorNDInterface.maxCachedSchedules:
+            templates = list(ScheduleBuilder.iterScheduleTemplates(sectionTable))
+
+        departments = set()
+        for course in courseNumberList:
+            try:
+                departments.add((parser.term, NDClassSearchParser.NDClassSearchParser.getDepartment(course)))
+            except ValueError:
+                pass
+        for section in sectionTable.sections:
+            departments.add((parser.term, NDClassSearchParser.NDClassSearchParser.getDepartment(section.courseNum)))
+        return ((sectionTable, templates, errorsList), departments)
+
+    # Helper generator that yields the JSON response for a page of schedules in chunks
+    # indices is an iterator over the compact schedules of the page, starting at position offset
+    @staticmethod
+    def __streamSchedules(sectionTable, indices, errorsList, offset):
+        encoder = ScheduleResultEncoder(sectionTable)
+
+        yield b'{"offset": ' + str(offset).encode() + b', "schedules": ['
+        first = True
+        while True:
+            chunk = [encoder.encodeSchedule(scheduleIndices)
+                     for scheduleIndices in itertools.islice(indices, ScheduleCreatorNDInterface.schedulesPerChunk)]
+            if not chunk:
+                break
+            yield ((", " if not first else "") + ", ".join(chunk)).encode()
+            first = False
+        yield b'], "sections": ' + encoder.encodeSections().encode()
+        yield b', "errors": ' + json.dumps(errorsList).encode() + b'}'
@@ -0,0 +1,145 @@
+# ScheduleResultCache.py
+# Process-wide cache of schedule search results, shared by every request the server handles
+
+import sys
+import threading
+from collections import OrderedDict
+
+# ScheduleResultCache
+# This class keeps the most recently used search results, evicting the least recently used ones once the estimated
+# size of the results passes maxBytes
+# Concurrent requests for the same key share a single computation (single-flight): the first caller computes the
+# result, and the others wait for it instead of starting their own search
+# Member variables:
+# maxBytes: the approximate number of bytes of results to keep
+# hits, misses: the number of lookups that were and weren't answered from the cache
+class ScheduleResultCache(object):
+
+    # Approximate number of bytes used by each section of a SectionTable (the Class object and its times), not counting
+    # its conflict bitset, which grows with the size of the table and is measured instead
+    bytesPerSection = 2048
+
+    # An entry in the cache
+    # result: the value returned by the compute function
+    # size: the estimated size of the result in bytes
+    # departments: the set of (term, department) tuples whose data the result was built from
+    class Entry(object):
+        def __init__(self, result, size, departments):
+            self.result = result
+            self.size = size
+            self.departments = departments
+
+    # A computation of a result that is in progress, which other requests for the same key wait on
+    # succeeded is set once result holds the computed result
+    # generation is the cache's invalidation count when the computation started; if any department is invalidated
+    # while it runs, the result may be stale, so it is handed to the waiting requests but not stored
+    class Computation(object):
+        def __init__(self, generation):
+            self.done = threading.Event()
+            self.succeeded = False
+            self.result = None
+            self.generation = generation
+
+    # Constructor for ScheduleResultCache
+    def __init__(self, maxBytes=64 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__inFlight = {}
+        self.__size = 0
+        self.__generation = 0
+        self.__lock = threading.Lock()
+
+    # Return the cached result for key, or call compute() to build it
+    # compute must return a tuple of (result, departments), where departments is a set of (term, department) tuples
+    # used by invalidateDepartment
+    def get(self, key, compute):
+        while True:
+            with self.__lock:
+                entry = self.__entries.get(key)
+                if entry is not None:
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.result
+                computation = self.__inFlight.get(key)
+                if computation is None:
+                    computation = ScheduleResultCache.Computation(self.__generation)
+                    self.__inFlight[key] = computation
+                    self.misses += 1
+                    break
+
+            # Another request is computing this result, so share it (or try again if that request failed)
+            computation.done.wait()
+            if computation.succeeded:
+                with self.__lock:
+                    self.hits += 1
+                return computation.result
+
+        try:
+            result, departments = compute()
+            computation.result = result
+            computation.succeeded = True
+            with self.__lock:
+                if computation.generation == self.__generation:
+                    self.__store(key, ScheduleResultCache.Entry(result, ScheduleResultCache.estimateSize(result),
+                                                                departments))
+            return result
+        finally:
+            with self.__lock:
+                del self.__inFlight[key]
+            computation.done.set()
+
+    # Remove every cached result that was built from a department's data for a term
+    def invalidateDepartment(self, term, department):
+        with self.__lock:
+            self.__generation += 1
+            for key in [key for key in self.__entries if (term, department) in self.__entries[key].departments]:
+                self.__remove(key)
+
+    # Remove every cached result
+    def clear(self):
+        with self.__lock:
+            self.__generation += 1
+            self.__entries.clear()
+            self.__size = 0
+
+    # Return the number of results in the cache
+    def size(self):
+        return len(self.__entries)
+
+    # Return the estimated size in bytes of a result, which is a tuple of a SectionTable, a list of schedule templates
+    # (or None) and a list of errors
+    # The tuples of interchangeable sections in the templates are shared with the other templates, so each of them is
+    # only counted once
+    @staticmethod
+    def estimateSize(result):
+        sectionTable, templates, errorsList = result
+        size = sectionTable.size() * ScheduleResultCache.bytesPerSection + sys.getsizeof(errorsList)
+        size += sys.getsizeof(sectionTable.conflicts) + sum(sys.getsizeof(mask) for mask in sectionTable.conflicts)
+        if templates is not None:
+            size += sys.getsizeof(templates)
+            members = {}
+            for template in templates:
+                size += sys.getsizeof(template)
+                for indices in template:
+                    members[id(indices)] = indices
+            size += sum(sys.getsizeof(indices) for indices in members.values())
+        return size
+
+    # Helper function to add an entry and evict the least recently used entries until the cache fits in maxBytes
+    # Entries that are larger than the whole cache are not stored
+    def __store(self, key, entry):
+        if entry.size > self.maxBytes:
+            return
+        if key in self.__entries:
+            self.__remove(key)
+        self.__entries[key] = entry
+        self.__size += entry.size
+        while self.__size > self.maxBytes:
+            self.__remove(next(iter(self.__entries)))
+
+    # Helper function to remove an entry
+    def __remove(self, key):
+        entry = self.__entries.pop(key)
+        self.__size -= entry.size
@@ -0,0 +1,191 @@
+# Benchmarks.py
+# This module runs the benchmark scenarios and reports their results as JSON, so that runs from before and after a
+# change can be compared
+# Run it from the root of the repository:
+#   python -m src.benchmarks.Benchmarks [--output results.json] [--compare old.json] [--repeat 3] [scenario ...]
+
+# Results format:
+# {"version": 1, "python": ..., "platform": ..., "created": ..., "scenarios": {<scenario>: {"parameters": {...},
+#   "results": {<benchmark>: {"seconds": ..., "peakBytes": ..., <benchmark specific counts and rates>}}}}}
+# seconds is the fastest of the repeated runs, and peakBytes is the peak memory allocated while the benchmark ran
+# (measured in a separate run, since tracing allocations slows everything down)
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from src.class_scheduler import ScheduleBuilder, ScheduleResultEncoder
+from src.benchmarks.SyntheticCatalog import SyntheticCatalog, SyntheticCoursePageParser
+from src.benchmarks import ClassSearchFixtures
+
+VERSION = 1
+
+# Scenarios to run
+# courses is the number of courses a student picks from the catalog to build schedules from; the other values are the
+# arguments used to generate the catalog (see SyntheticCatalog)
+SCENARIOS = {
+	"small": dict(courses=4, coursesPerDepartment=10, sectionsPerCourse=4, corecDensity=0.2, congestion=0.2),
+	"typical": dict(courses=5, coursesPerDepartment=20, sectionsPerCourse=8, corecDensity=0.3, congestion=0.3),
+	"congested": dict(courses=5, coursesPerDepartment=20, sectionsPerCourse=10, corecDensity=0.3, congestion=0.8),
+	"corecHeavy": dict(courses=5, coursesPerDepartment=20, sectionsPerCourse=6, corecDensity=0.9, congestion=0.3),
+	"wide": dict(courses=7, coursesPerDepartment=40, sectionsPerCourse=12, corecDensity=0.2, congestion=0.1),
+}
+
+# Largest number of schedules enumerated by a single benchmark, so that huge scenarios still finish
+maxSchedules = 200000
+
+# Number of schedules encoded by the JSON benchmarks
+encodedSchedules = 5000
+
+# Function to run one scenario and return its results
+# repeat is the number of times each benchmark is timed
+def runScenario(name, parameters, repeat=3):
+	parameters = dict(parameters)
+	courseCount = parameters.pop("courses")
+	catalog = SyntheticCatalog(departments=("SYN", "BEN"), **parameters)
+	parser = SyntheticCoursePageParser(catalog)
+
+	# Pick courses spread across the catalog
+	courseNums = catalog.getCourseNumbers()
+	courseNums = courseNums[::max(1, len(courseNums) // courseCount)][:courseCount]
+	results = {}
+
+	table = __measure(results, "buildSectionTable", repeat,
+	                  lambda: ScheduleBuilder.buildSectionTable(parser, courseNums, []),
+	                  lambda table: dict(sections=table.size()))
+
+	__measure(results, "iterSchedules", repeat,
+	          lambda: sum(1 for schedule in ScheduleBuilder.iterSchedules(parser, courseNums, limit=maxSchedules)),
+	          lambda count: dict(schedules=count))
+
+	__measure(results, "iterCompactSchedules", repeat,
+	          lambda: sum(1 for indices in ScheduleBuilder.iterCompactSchedules(table, limit=maxSchedules)),
+	          lambda count: dict(schedules=count))
+
+	__measure(results, "iterScheduleTemplates", repeat,
+	          lambda: list(ScheduleBuilder.iterScheduleTemplates(table, limit=maxSchedules)),
+	          lambda templates: dict(templates=len(templates),
+	                                 schedules=sum(ScheduleBuilder.countTemplate(template) for template in templates)))
+
+	__measure(results, "countSchedules", repeat, lambda: ScheduleBuilder.countCompactSchedules(table),
+	          lambda count: dict(schedules=count))
+
+	# Encoding, with and without the deduplicated sections table
+	compactSchedules = list(ScheduleBuilder.iterCompactSchedules(table, limit=encodedSchedules))
+	__measure(results, "scheduleToJSON", repeat,
+	          lambda: sum(len(table.materialize(indices).toJSON()) for indices in compactSchedules),
+	          lambda size: dict(schedules=len(compactSchedules), bytes=size))
+	__measure(results, "scheduleResultEncoder", repeat,
+	          lambda: len(ScheduleResultEncoder.encode(table, compactSchedules)),
+	          lambda size: dict(schedules=len(compactSchedules), bytes=size))
+
+	# Parsing Class Search pages for the whole catalog
+	directory = tempfile.mkdtemp()
+	try:
+		ClassSearchFixtures.writeFixtures(catalog, directory)
+		__measure(results, "parseClassSearch", repeat,
+		          lambda: sum(len(sections) for sections in ClassSearchFixtures.FixtureClassSearchParser(
+		                      directory, catalog.term).getAllSectionsForCourses(sorted(catalog.courses)).values()),
+		          lambda sections: dict(courses=len(catalog.courses), sections=sections))
+	finally:
+		shutil.rmtree(directory)
+
+	# Rates
+	for benchmark in results:
+		seconds = results[benchmark]["seconds"]
+		for (countName, rateName) in [("schedules", "schedulesPerSecond"), ("sections", "sectionsPerSecond"),
+		                              ("courses", "coursesPerSecond")]:
+			if countName in results[benchmark]:
+				results[benchmark][rateName] = results[benchmark][countName] / seconds if seconds else None
+
+	return {"parameters": dict(catalog.parameters, courses=courseNums), "results": results}
+
+# Function to run the scenarios with the given names (all of them if names is empty) and return the results
+def runBenchmarks(names=None, repeat=3):
+	names = names or sorted(SCENARIOS)
+	report = {"version": VERSION, "python": platform.python_version(), "platform": platform.platform(),
+	          "created": time.time(), "scenarios": {}}
+	for name in names:
+		if name not in SCENARIOS:
+			raise ValueError("Unknown scenario {}".format(name))
+		report["scenarios"][name] = runScenario(name, SCENARIOS[name], repeat)
+	return report
+
+# Function to compare two reports, returning a list of lines with the ratio of the new time to the old time of every
+# benchmark in both reports (below 1 is faster)
+def compareReports(oldReport, newReport):
+	lines = []
+	for name in sorted(newReport["scenarios"]):
+		if name not in oldReport["scenarios"]:
+			continue
+		oldResults = oldReport["scenarios"][name]["results"]
+		newResults = newReport["scenarios"][name]["results"]
+		for benchmark in sorted(newResults):
+			if benchmark not in oldResults or not oldResults[benchmark]["seconds"]:
+				continue
+			timeRatio = newResults[benchmark]["seconds"] / oldResults[benchmark]["seconds"]
+			memoryRatio = newResults[benchmark]["peakBytes"] / max(1, oldResults[benchmark]["peakBytes"])
+			lines.append("{:<12} {:<24} time x{:.2f}  memory x{:.2f}".format(name, benchmark, timeRatio, memoryRatio))
+	return lines
+
+# Helper function to time function (the fastest of repeat runs) and measure its peak memory, storing the results under
+# benchmark in results
+# describe is called with the return value of function, and returns a dictionary of counts to store with the results
+# Returns the return value of function
+def __measure(results, benchmark, repeat, function, describe):
+	seconds = None
+	for run in range(repeat):
+		start = time.perf_counter()
+		value = function()
+		elapsed = time.perf_counter() - start
+		seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+	tracemalloc.start()
+	try:
+		function()
+		peakBytes = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+	results[benchmark] = dict(seconds=seconds, peakBytes=peakBytes)
+	results[benchmark].update(describe(value))
+	return value
+
+# Function to run the benchmarks from the command line
+def main(argv):
+	argumentParser = argparse.ArgumentParser(prog="python -m src.benchmarks.Benchmarks",
+	                                         description="Run the schedule builder benchmarks")
+	argumentParser.add_argument("scenarios", nargs="*", help="scenarios to run (default: all of {})"
+	                            .format(", ".join(sorted(SCENARIOS))))
+	argumentParser.add_argument("--output", help="file to write the JSON results to (default: standard output)")
+	argumentParser.add_argument("--compare", help="results file from an earlier run to compare against")
+	argumentParser.add_argument("--repeat", type=int, default=3, help="number of times each benchmark is timed")
+	arguments = argumentParser.parse_args(argv[1:])
+
+	# Log records would otherwise be included in every measurement
+	logging.disable(logging.CRITICAL)
+	try:
+		report = runBenchmarks(arguments.scenarios, max(1, arguments.repeat))
+	except ValueError as e:
+		argumentParser.error(str(e))
+
+	output = json.dumps(report, indent=2, sort_keys=True)
+	if arguments.output:
+		with open(arguments.output, "w") as outputFile:
+			outputFile.write(output + "\n")
+	else:
+		print(output)
+
+	if arguments.compare:
+		with open(arguments.compare) as compareFile:
+			for line in compareReports(json.load(compareFile), report):
+				print(line, file=sys.stderr)
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
@@ -0,0 +1,94 @@
+# ClassSearchFixtures.py
+# This module writes Class Search pages for a SyntheticCatalog to a directory, and contains FixtureClassSearchParser,
+# which parses those pages instead of downloading them, so the parser can be benchmarked without the network
+
+# Fixture directory layout:
+# departments/<department>.html: the Class Search results page for a department
+# courses/<crn>.html: the course page of a section, which lists the corecs of the course
+# Pages saved from the real Class Search site can be dropped into the same layout to benchmark the parser on them
+
+import html
+import os
+import re
+from src.school_extensions.UniversityOfNotreDame import NDClassSearchParser
+
+# Function to write the Class Search pages for every department and section in a catalog to directory
+def writeFixtures(catalog, directory):
+	os.makedirs(os.path.join(directory, "departments"), exist_ok=True)
+	os.makedirs(os.path.join(directory, "courses"), exist_ok=True)
+
+	departments = {}
+	for courseNum in sorted(catalog.courses):
+		departments.setdefault(NDClassSearchParser.NDClassSearchParser.getDepartment(courseNum), []).append(courseNum)
+
+	for department in departments:
+		rows = []
+		for courseNum in departments[department]:
+			for section in catalog.courses[courseNum]:
+				rows.append(__renderRow(catalog.term, courseNum, section))
+				with open(os.path.join(directory, "courses", section.crn + ".html"), "w") as coursePage:
+					coursePage.write(__renderCoursePage(catalog.corecs.get(courseNum, [])))
+		with open(os.path.join(directory, "departments", department + ".html"), "w") as departmentPage:
+			departmentPage.write(__renderDepartmentPage(rows))
+
+# Helper function to render the results table of a department, in the format Class Search uses
+def __renderDepartmentPage(rows):
+	return ('<html><body><table id="resulttable"><thead><tr><th>Course - Sec</th></tr></thead><tbody>\n' +
+	        "\n".join(rows) + '\n</tbody></table></body></html>\n')
+
+# Helper function to render one row of a results table
+def __renderRow(term, courseNum, section):
+	url = NDClassSearchParser.NDClassSearchParser.classSearchURL
+	link = ("<a href=\"#\" onclick=\"openWin('{}?CRN={}&amp;TERM={}')\">{} - {}</a>"
+	        .format(url, section.crn, term, courseNum, section.sectionNum))
+	if section.days:
+		when = "{} - {} - {}".format(section.days, __formatTime(section.startMinute), __formatTime(section.endMinute))
+	else:
+		when = "TBA"
+	cells = [link, html.escape(section.name), "3", "", str(section.totalSpots), str(section.openSpots), "0", section.crn,
+	         "", "\n{}\n".format(html.escape(section.profName)), when, "", "", ""]
+	return "<tr>" + "".join("<td>{}</td>".format(cell) for cell in cells) + "</tr>"
+
+# Helper function to render a course page listing the given corecs
+def __renderCoursePage(corecNums):
+	if corecNums:
+		corecs = " ".join(re.sub("(\d{5})$", " \\1", num) for num in corecNums)
+		details = ('<span class="fieldlabeltext">Corequisites:</span> {} '
+		           '<span class="fieldlabeltext">Comments:</span> None'.format(corecs))
+	else:
+		details = '<span class="fieldlabeltext">Restrictions:</span> None'
+	return '<html><body><table class="datadisplaytable"><tr><td>{}</td></tr></table></body></html>\n'.format(details)
+
+# Helper function to format minutes after midnight the way Class Search does (e.g. 10:30A)
+def __formatTime(minutes):
+	hour, minute = divmod(minutes, 60)
+	return "{}:{:02d}{}".format(hour % 12 or 12, minute, "A" if hour < 12 else "P")
+
+# FixtureClassSearchParser:
+# This class is an NDClassSearchParser that reads Class Search pages from a fixture directory (see writeFixtures)
+# instead of downloading them
+# Instance variables:
+# directory: the fixture directory
+class FixtureClassSearchParser(NDClassSearchParser.NDClassSearchParser):
+
+	# Constructor for FixtureClassSearchParser
+	def __init__(self, directory, term="201620"):
+		super().__init__(term=term)
+		self.directory = directory
+
+	# Returns the content of the saved results page for a department, or an empty page if there is none
+	def _fetchClassSearchPage(self, department):
+		return self.__readPage("departments", department)
+
+	# Returns the content of the saved course page for the section in url, or an empty page if there is none
+	def _fetchCoursePage(self, url):
+		match = re.search("CRN=(\d+)", url)
+		return self.__readPage("courses", match.group(1) if match else "")
+
+	# Helper function to read a page from the fixture directory
+	def __readPage(self, kind, name):
+		try:
+			with open(os.path.join(self.directory, kind, name + ".html"), "rb") as page:
+				return page.read()
+		except IOError:
+			return b"<html></html>"
@@ -0,0 +1,135 @@
+# SyntheticCatalog.py
+# This module contains the SyntheticCatalog class, the SyntheticSection type, and SyntheticCoursePageParser
+
+# SyntheticCatalog:
+# This class generates a random but reproducible course catalog, so that benchmarks can be run on catalogs of any shape
+# without contacting Class Search
+# Instance variables:
+# term: the term the catalog pretends to be for
+# courses: a dictionary with course numbers (e.g. SYN10010) as keys and lists of SyntheticSection objects as values
+# corecs: a dictionary with course numbers as keys and lists of the course numbers of their corecs as values
+# parameters: a dictionary of the arguments the catalog was generated with
+
+from collections import namedtuple
+import random
+from src.class_scheduler import CoursePageParser, ClassTime, UndefinedClassTime
+from src.school_extensions.UniversityOfNotreDame import NDClass
+
+# SyntheticSection:
+# One section of a generated course
+# days is a string of day letters (e.g. MWF), and startMinute and endMinute are minutes after midnight; a section with
+# no days is TBA
+SyntheticSection = namedtuple("SyntheticSection", ["name", "sectionNum", "crn", "profName", "days", "startMinute",
+                                                   "endMinute", "openSpots", "totalSpots"])
+
+class SyntheticCatalog(object):
+
+	# Meeting patterns with the length of each meeting in minutes, as they are used at Notre Dame
+	meetingPatterns = [("MWF", 50), ("TR", 75), ("MW", 75), ("M", 165), ("R", 110)]
+
+	# Start and end of the teaching day, in minutes after midnight
+	firstStart = 8 * 60
+	lastEnd = 22 * 60
+
+	# Constructor for SyntheticCatalog
+	# departments: the department identifiers to generate courses for
+	# coursesPerDepartment: the number of courses generated in each department, not counting corec courses
+	# sectionsPerCourse: the largest number of sections a course can have; each course has between half and all of
+	#   this many
+	# corecDensity: the fraction of courses that have a corec (a separate lab course every section must be taken with)
+	# congestion: from 0 to 1, how crowded the teaching day is; at 0 meetings start at any time between firstStart and
+	#   lastEnd, and at 1 they all start within the first hour, so most sections conflict
+	# seed: the seed for the random number generator, so the same arguments always give the same catalog
+	def __init__(self, departments=("SYN",), coursesPerDepartment=6, sectionsPerCourse=5, corecDensity=0.3,
+	             congestion=0.5, seed=0, term="201620"):
+		self.term = term
+		self.courses = {}
+		self.corecs = {}
+		self.parameters = dict(departments=list(departments), coursesPerDepartment=coursesPerDepartment,
+		                       sectionsPerCourse=sectionsPerCourse, corecDensity=corecDensity, congestion=congestion,
+		                       seed=seed)
+
+		self.__random = random.Random(seed)
+		self.__nextCrn = 10000
+		latestStart = self.firstStart + max(60, int((self.lastEnd - 180 - self.firstStart) * (1 - congestion)))
+		for department in departments:
+			for course in range(coursesPerDepartment):
+				courseNum = "{}{:05d}".format(department, 10000 + course * 10)
+				self.courses[courseNum] = self.__generateSections(courseNum, sectionsPerCourse, latestStart)
+
+				# The corec of a course gets the next course number, like a lab
+				if self.__random.random() < corecDensity:
+					corecNum = "{}{:05d}".format(department, 10000 + course * 10 + 1)
+					self.courses[corecNum] = self.__generateSections(corecNum, sectionsPerCourse, latestStart)
+					self.corecs[courseNum] = [corecNum]
+
+	# Function to return the course numbers of the courses a student would pick (every course that isn't a corec)
+	def getCourseNumbers(self):
+		corecNums = set(num for corecNums in self.corecs.values() for num in corecNums)
+		return sorted(num for num in self.courses if num not in corecNums)
+
+	# Function to return the department identifiers used in the catalog
+	def getDepartments(self):
+		return list(self.parameters["departments"])
+
+	# Function to return the number of sections in the catalog
+	def size(self):
+		return sum(len(sections) for sections in self.courses.values())
+
+	# Helper function to generate the sections of one course
+	def __generateSections(self, courseNum, sectionsPerCourse, latestStart):
+		rng = self.__random
+		sections = []
+		for sectionIndex in range(rng.randint((sectionsPerCourse + 1) // 2, sectionsPerCourse)):
+			self.__nextCrn += 1
+			if rng.random() < 0.05:
+				days, startMinute, endMinute = ("", 0, 0)
+			else:
+				days, length = rng.choice(self.meetingPatterns)
+				startMinute = rng.randrange(self.firstStart, latestStart + 1, 5)
+				endMinute = startMinute + length
+			totalSpots = rng.choice([20, 30, 45, 120])
+			sections.append(SyntheticSection(name="Synthetic Course {}".format(courseNum),
+			                                 sectionNum="{:02d}".format(sectionIndex + 1), crn=str(self.__nextCrn),
+			                                 profName="Professor {}".format(rng.choice("ABCDEFGH")), days=days,
+			                                 startMinute=startMinute, endMinute=endMinute,
+			                                 openSpots=rng.randint(0, totalSpots), totalSpots=totalSpots))
+		return sections
+
+# SyntheticCoursePageParser:
+# This class serves the sections of a SyntheticCatalog as NDClass objects, with their corecs
+# The objects are built when the parser is created, so looking up courses doesn't include any parsing
+class SyntheticCoursePageParser(CoursePageParser):
+
+	# Constructor for SyntheticCoursePageParser
+	def __init__(self, catalog):
+		self.term = catalog.term
+		self.catalog = catalog
+		self.__sections = {}
+		for courseNum in catalog.courses:
+			self.__sections[courseNum] = [SyntheticCoursePageParser.__buildClass(courseNum, section)
+			                              for section in catalog.courses[courseNum]]
+		for courseNum in catalog.corecs:
+			for corecNum in catalog.corecs[courseNum]:
+				for section in self.__sections[courseNum]:
+					section.addCorec(corecNum, self.__sections[corecNum])
+
+	# Accepts a course number, and returns a list of NDClass objects representing every section of the course
+	# Raises a ValueError when the course isn't in the catalog
+	def getAllSectionsForCourse(self, courseNumberString):
+		courseNumberString = courseNumberString.strip().replace(" ", "").upper()
+		if courseNumberString not in self.__sections:
+			raise ValueError("Course {} not found".format(courseNumberString))
+		return self.__sections[courseNumberString]
+
+	# Helper function to build an NDClass object from a SyntheticSection
+	@staticmethod
+	def __buildClass(courseNum, section):
+		if section.days:
+			classTime = ClassTime(section.startMinute // 60, section.startMinute % 60, section.endMinute // 60,
+			                      section.endMinute % 60)
+			classTimes = {day: classTime for day in section.days}
+		else:
+			classTimes = {"U":UndefinedClassTime()}
+		return NDClass.NDClass(section.name, courseNum, section.sectionNum, classTimes, section.crn, section.profName,
+		                       section.openSpots, section.totalSpots)
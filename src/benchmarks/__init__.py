@@ -0,0 +1,2 @@
+from .SyntheticCatalog import SyntheticCatalog, SyntheticSection, SyntheticCoursePageParser
+from .ClassSearchFixtures import FixtureClassSearchParser, writeFixtures
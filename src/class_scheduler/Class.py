@@ -1,13 +1,21 @@
 # Class.py
 # This module defines an abstract class that represents a class at a school
 
-from abc import ABC, abstractmethod
+from abc import abstractmethod
 from src.class_scheduler.ClassSchedulerJSONEncoder import JSONEncoderInterface
 from src.class_scheduler.SectionList import SectionList
+from src.class_scheduler.ClassTime import getWeekMask
+
+# Corec list shared by every section without corecs, so that those sections don't each need their own SectionList
+# It must never be changed; addCorec gives a section its own SectionList before adding the first corec
+EMPTY_COREC_LIST = SectionList()
 
 #Class to represent a section of a course at a school
 # Subclasses must override conflictsWith, and may need to override __eq__
-class Class(JSONEncoderInterface, ABC):
+# Sections use __slots__ to keep a whole term of them small in memory; subclasses should declare __slots__ for their
+# own member variables too
+class Class(JSONEncoderInterface):
+	__slots__ = ("name", "courseNum", "sectionNum", "classTimes", "timeMask", "corecs")
 
 	# Constructor for Class object
 	# Member variables:
@@ -17,14 +25,16 @@ class Class(JSONEncoderInterface, ABC):
 	# classTimes: a dictionary of ClassTime objects describing when class meetings take place;
 	#   Keys are uppercase day identifiers (i.e. M, T, W, R, F)
 	#   Use the key "U" with an UndefinedClassTime object to indicate that a particular class has an undefined time
-	# corecs: a SectionList object that defines the corecs for the given class
+	# timeMask: an integer bitmask of every time slot in the week occupied by classTimes (see ClassTime.getWeekMask)
+	# corecs: a SectionList object that defines the corecs for the given class (EMPTY_COREC_LIST if there are none)
 	def __init__(self, name, courseNum, sectionNum, classTimes):
 		self.name = name
 		self.courseNum = courseNum
 		self.sectionNum = sectionNum
 		self.classTimes = {}
+		self.timeMask = 0
 		self.addTimes(classTimes)
-		self.corecs = SectionList()
+		self.corecs = EMPTY_COREC_LIST
 
 	# Function to determine if two classes conflict
 	# Returns true if the classes cannot be taken together, false otherwise
@@ -37,12 +47,29 @@ class Class(JSONEncoderInterface, ABC):
 	def addTimes(self, times):
 		for day in times:
 			self.classTimes[day.upper()] = times[day]
+		self.timeMask = getWeekMask(self.classTimes)
+
+	# Function to determine if the meeting times of two classes overlap on any day
+	# Subclasses can use this in conflictsWith instead of comparing classTimes day by day
+	def timesConflictWith(self, otherClass):
+		return (self.timeMask & otherClass.timeMask) != 0
+
+	# Function to determine if the class conflicts with a schedule from a summary of the classes in it, without comparing
+	# it with each of them (see Schedule.addClass)
+	# occupiedMask: the bitwise OR of the timeMasks of the classes in the schedule
+	# courseCounts: a dictionary of the course numbers of the classes in the schedule, and how many classes have each
+	# Returns None if the answer depends on more than that, in which case conflictsWith is called for each class
+	# Subclasses whose conflictsWith only depends on meeting times and course numbers should override this
+	def conflictsWithOccupancy(self, occupiedMask, courseCounts):
+		return None
 
 	# Function to add a corec to the class
 	# courseNum: the course number of the corec
 	# sectionList: a Python list of Class objects that represent the classes of courseNum that are corecs for
 	# the class section represented by self
 	def addCorec(self, courseNum, sectionsList):
+		if self.corecs is EMPTY_COREC_LIST:
+			self.corecs = SectionList()
 		self.corecs.insertSectionsForNewCourse(courseNum, sectionsList)
 
 	# Function to determine if the class has any corecs
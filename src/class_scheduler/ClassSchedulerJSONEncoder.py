@@ -2,7 +2,7 @@
 # This module defines a subclass of JSONEncoder to encode the complex objects used in this package into JSON
 
 import json
-from abc import ABC, abstractmethod
+from abc import ABCMeta, abstractmethod
 
 # This class is used to represent objects in this package in JSON
 # Call json.dumps(obj, cls=ClassSchedulerJSONEncoder) to properly encode objects into JSON
@@ -14,11 +14,48 @@ class ClassSchedulerJSONEncoder(json.JSONEncoder):
 			return json.JSONEncoder.default(self, obj)
 
 # This class is used as an interface that classes can extend which will allow them to be encoded as a JSON string
-class JSONEncoderInterface(ABC):
+# It declares no member variables, so that subclasses can use __slots__
+class JSONEncoderInterface(metaclass=ABCMeta):
+	__slots__ = ()
+
 	# Function to return a JSON string representing the given object
 	def toJSON(self):
 		return json.dumps(self._toJSON(), cls=ClassSchedulerJSONEncoder)
 
 	@abstractmethod
 	def _toJSON(self):
-		raise NotImplementedError
\ No newline at end of file
+		raise NotImplementedError
+
+# This class encodes compact schedules (tuples of indices into a SectionTable) without repeating the sections they share
+# Each schedule is encoded as a list of section ids, and every distinct section is encoded once, in the order it was
+# first used, by encodeSections; a section's id is its position in that list
+# Call encodeSchedule for every schedule first, then encodeSections
+class ScheduleResultEncoder(object):
+
+	# Constructor for ScheduleResultEncoder
+	def __init__(self, sectionTable):
+		self.sectionTable = sectionTable
+		self.__ids = {}
+		self.__indices = []
+
+	# Function to return a JSON string representing a compact schedule as a list of section ids
+	def encodeSchedule(self, indices):
+		sectionIds = []
+		for index in indices:
+			sectionId = self.__ids.get(index)
+			if sectionId is None:
+				sectionId = self.__ids[index] = len(self.__indices)
+				self.__indices.append(index)
+			sectionIds.append(sectionId)
+		return json.dumps(sectionIds)
+
+	# Function to return a JSON string with the list of every section used by the schedules encoded so far
+	def encodeSections(self):
+		return "[" + ", ".join(self.sectionTable.sectionToJSON(index) for index in self.__indices) + "]"
+
+	# Function to return a JSON string of an object with a "sections" list and a "schedules" list of section ids
+	@staticmethod
+	def encode(sectionTable, compactSchedules):
+		encoder = ScheduleResultEncoder(sectionTable)
+		schedules = ", ".join(encoder.encodeSchedule(indices) for indices in compactSchedules)
+		return '{"sections": ' + encoder.encodeSections() + ', "schedules": [' + schedules + ']}'
@@ -1,23 +1,84 @@
 # ClassTime.py
 # This module defines two classes (ClassTime and UndefinedClassTime) that are used to record the time at which a class
-# takes place
+# takes place, along with helpers to convert those times into bitmasks for fast conflict checks
 
 import datetime as dt
 from src.class_scheduler.ClassSchedulerJSONEncoder import JSONEncoderInterface
 
+# Times are reduced to bitmasks for fast conflict checks
+# Each day is split into slots of SLOT_MINUTES minutes, and each day of the week gets its own run of SLOTS_PER_DAY bits
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = (24 * 60) // SLOT_MINUTES
+
+# Position of each day within a week bitmask; days not listed here are given the next free position when first seen
+__dayIndices = {day: index for index, day in enumerate("MTWRFS")}
+
+# Function to combine a dictionary of ClassTime objects (keyed by day) into a single bitmask covering the whole week
+# Two dictionaries of times conflict if and only if the bitwise AND of their week masks is nonzero
+def getWeekMask(classTimes):
+	mask = 0
+	for day in classTimes:
+		slotMask = classTimes[day].getSlotMask()
+		if slotMask:
+			mask |= slotMask << (__getDayIndex(day) * SLOTS_PER_DAY)
+	return mask
+
+# Function to split a week bitmask into a list of day bitmasks, in week order
+# The list ends at the last day that has any slot occupied
+def getDayMasks(weekMask):
+	dayMasks = []
+	fullDay = (1 << SLOTS_PER_DAY) - 1
+	while weekMask:
+		dayMasks.append(weekMask & fullDay)
+		weekMask >>= SLOTS_PER_DAY
+	return dayMasks
+
+# Function to return the position of a day within a week bitmask
+def __getDayIndex(day):
+	day = day.upper()
+	if day not in __dayIndices:
+		__dayIndices[day] = len(__dayIndices)
+	return __dayIndices[day]
+
 # ClassTime
 # This class defines an object that represents the time of a class (as a span of time)
+# ClassTime objects are immutable and interned: creating a ClassTime with the same times as an existing one returns the
+# existing object, so the many sections that meet at the same time (e.g. 10:30-11:20) share a single ClassTime
 # member variables:
 # startTime: Time object representing the start of the class on a given day
 # endTime: Time object representing the end of the class on a given day
 # neverConflict: Boolean variable indicating whether the time can conflict with another time or not
 class ClassTime(JSONEncoderInterface):
+	__slots__ = ("startTime", "endTime", "neverConflict", "__slotMask")
+
+	# Every ClassTime created so far, keyed by its class and times
+	__instances = {}
+
+	# Returns the interned ClassTime object for the given times, creating it if needed
+	def __new__(cls, startHour=0, startMin=0, endHour=0, endMin=0):
+		key = (cls, startHour, startMin, endHour, endMin)
+		instance = ClassTime.__instances.get(key)
+		if instance is None:
+			instance = super().__new__(cls)
+			object.__setattr__(instance, "startTime", dt.time(startHour, startMin))
+			object.__setattr__(instance, "endTime", dt.time(endHour, endMin))
+			object.__setattr__(instance, "neverConflict", False)
+			object.__setattr__(instance, "_ClassTime__slotMask", None)
+			instance = ClassTime.__instances.setdefault(key, instance)
+		return instance
 
 	# Constructor for ClassTime object
+	# The object is set up by __new__, since an interned object may be returned more than once
 	def __init__(self, startHour=0, startMin=0, endHour=0, endMin=0):
-		self.startTime = dt.time(startHour, startMin)
-		self.endTime = dt.time(endHour, endMin)
-		self.neverConflict = False
+		pass
+
+	# ClassTime objects are shared, so their member variables can't be changed
+	def __setattr__(self, name, value):
+		raise AttributeError("ClassTime objects are immutable")
+
+	# Function to allow ClassTime objects to be pickled and copied, which must also go through __new__
+	def __reduce__(self):
+		return (self.__class__, (self.startTime.hour, self.startTime.minute, self.endTime.hour, self.endTime.minute))
 
 	# Function to determine if two times conflict
 	# Returns a boolean indicating whether the given time conflicts with the other time
@@ -33,6 +94,17 @@ class ClassTime(JSONEncoderInterface):
 		else:
 			return True
 
+	# Function to return a bitmask of the slots this time occupies within a single day
+	# Both endpoints are included, as in conflictsWith, so two times that share a boundary minute also share a slot
+	# Times that don't fall on a slot boundary are widened to whole slots
+	def getSlotMask(self):
+		if self.__slotMask is None:
+			startSlot = (self.startTime.hour * 60 + self.startTime.minute) // SLOT_MINUTES
+			endSlot = (self.endTime.hour * 60 + self.endTime.minute) // SLOT_MINUTES
+			endSlot = max(startSlot, endSlot)
+			object.__setattr__(self, "_ClassTime__slotMask", ((1 << (endSlot - startSlot + 1)) - 1) << startSlot)
+		return self.__slotMask
+
 	# Helper function to return the object in a JSON serializable format
 	def _toJSON(self):
 		return dict(__type__="ClassTime", startTime=self.startTime.isoformat(), endTime=self.endTime.isoformat(),
@@ -40,13 +112,28 @@ class ClassTime(JSONEncoderInterface):
 
 # UndefinedClassTime
 # This class is used to indicate that a time for a given course has not been set
-# This class extends ClassTime and does not introduce any new member variables
+# This class extends ClassTime and does not introduce any new member variables; every UndefinedClassTime is the same
+# interned object
 class UndefinedClassTime(ClassTime):
+	__slots__ = ()
+
+	def __new__(cls):
+		instance = super().__new__(cls)
+		object.__setattr__(instance, "neverConflict", True)
+		return instance
+
 	def __init__(self):
-		super().__init__()
-		self.neverConflict = True
+		pass
+
+	def __reduce__(self):
+		return (self.__class__, ())
 
 	# Function to determine if this class conflicts with another class
 	# Always returns False because these times do not conflict with other class times
 	def conflictsWith(self, otherClassTime):
 		return False
+
+	# Function to return the slots this time occupies
+	# Always returns an empty mask because these times do not conflict with other class times
+	def getSlotMask(self):
+		return 0
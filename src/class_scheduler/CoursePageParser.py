@@ -12,4 +12,17 @@ class CoursePageParser(ABC):
 	# Should raise ValueError when the course number can't be parsed, the department is invalid, or the course can't be found
 	@abstractmethod
 	def getAllSectionsForCourse(self, courseNumberString):
-		raise NotImplementedError
\ No newline at end of file
+		raise NotImplementedError
+
+	# Accepts a list of course numbers, and returns a dictionary with each course number as a key, and either the list of
+	# Class objects for that course or the ValueError raised by getAllSectionsForCourse as the value
+	# The default implementation looks up each course in turn; parsers that can fetch several courses at once should
+	# override it
+	def getAllSectionsForCourses(self, courseNumberList):
+		results = {}
+		for courseNumberString in courseNumberList:
+			try:
+				results[courseNumberString] = self.getAllSectionsForCourse(courseNumberString)
+			except ValueError as e:
+				results[courseNumberString] = e
+		return results
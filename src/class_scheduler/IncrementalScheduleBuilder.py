@@ -0,0 +1,138 @@
+# IncrementalScheduleBuilder.py
+# This class builds the schedules for a list of courses that changes one course at a time (e.g. while a student refines
+# their list), reusing the work done for the previous list instead of searching from scratch after every change
+# Member variables:
+# parser: the CoursePageParser used to look up courses
+# constraints: an optional ScheduleConstraints that every schedule must satisfy
+# sectionTable: a SectionTable holding the sections of every course added so far
+# courseNums: the course numbers of the courses in the list, in the order they were added
+# The compact schedules for the prefixes of courseNums are kept: the schedules for the first i courses are extended
+# with the sections of course i + 1 to get the schedules for the first i + 1 courses
+# Adding a course only extends the schedules for the whole list with the new course's compatible sections
+# Removed courses keep their course group (and their sections stay in sectionTable), so adding a course back reuses
+# the group instead of looking the course up and adding its sections to the table again
+# Removing a course restarts from the schedules for the courses before it, and re-adds every course after it
+# (schedules can't simply be projected onto the remaining courses, since schedules that were ruled out by the removed
+# course would be missing), so removing one of the first courses costs about as much as searching the whole list again
+# Only maxStoredSchedules schedules are kept across all the prefixes; once the next prefix would go over that, no more
+# prefixes are stored, and the schedules for the whole list are found again from the longest stored prefix each time
+# they are requested (as the schedules controller does for large searches)
+
+import itertools
+from src.class_scheduler import ScheduleBuilder, SectionTable
+
+class IncrementalScheduleBuilder(object):
+
+	# Largest number of compact schedules stored for all of the prefixes together
+	maxStoredSchedules = 100000
+
+	# Constructor for IncrementalScheduleBuilder
+	def __init__(self, parser, constraints=None):
+		self.parser = parser
+		self.constraints = constraints
+		self.sectionTable = SectionTable(sectionFilter=constraints.filterSections if constraints is not None else None)
+		self.courseNums = []
+		self.__groups = []
+		self.__corecNums = []
+		self.__removedCourses = {}
+		self.__levels = [[()]]
+		self.__storedSchedules = 1
+
+	# Function to add a course to the list and extend the schedules with it
+	# Returns a list of errors, which is empty if the course was added (or was already in the list)
+	# A course that is a corec of a course in the list is already part of every schedule, so it isn't added again
+	def addCourse(self, courseNumberString):
+		courseNum = courseNumberString.strip().replace(" ", "").upper()
+		if courseNum in self.__removedCourses:
+			group, courseCorecNums = self.__removedCourses[courseNum]
+		else:
+			sections = self.parser.getAllSectionsForCourses([courseNumberString])[courseNumberString]
+			if isinstance(sections, ValueError):
+				return [str(sections)]
+			if not sections:
+				return ["Course {} not found".format(courseNumberString)]
+			courseNum = sections[0].courseNum
+			group = None
+			courseCorecNums = set(sections[0].corecs.courseNums)
+
+		if courseNum in self.courseNums or any(courseNum in corecNums for corecNums in self.__corecNums):
+			return []
+
+		if group is None:
+			group = self.sectionTable.addCourse(sections)
+		self.__removedCourses.pop(courseNum, None)
+		self.courseNums.append(courseNum)
+		self.__groups.append(group)
+		self.__corecNums.append(courseCorecNums)
+		self.__extendLevels()
+		return []
+
+	# Function to remove a course from the list and update the schedules
+	# Returns True if the course was removed, or False if it wasn't in the list
+	# The course group is kept, so adding the course back reuses it instead of adding its sections to sectionTable again
+	def removeCourse(self, courseNumberString):
+		courseNum = courseNumberString.strip().replace(" ", "").upper()
+		if courseNum not in self.courseNums:
+			return False
+
+		position = self.courseNums.index(courseNum)
+		self.__removedCourses[courseNum] = (self.__groups[position], self.__corecNums[position])
+		del self.courseNums[position]
+		del self.__groups[position]
+		del self.__corecNums[position]
+		for level in self.__levels[position + 1:]:
+			self.__storedSchedules -= len(level)
+		del self.__levels[position + 1:]
+		self.__extendLevels()
+		return True
+
+	# Generator that yields the schedules for the courses in the list as tuples of indices into sectionTable
+	# The schedules are in the same order as ScheduleBuilder.iterCompactSchedules would find them for the same courses
+	def iterCompactSchedules(self):
+		if not self.courseNums:
+			return
+		depth = len(self.__levels) - 1
+		if depth == len(self.__groups):
+			yield from self.__levels[-1]
+			return
+		for placed in self.__levels[-1]:
+			yield from ScheduleBuilder.iterExtendedSchedules(self.sectionTable, self.__groups[depth:], placed)
+
+	# Function to return a list of the schedules for the courses in the list (see iterCompactSchedules)
+	def getCompactSchedules(self):
+		return list(self.iterCompactSchedules())
+
+	# Function to return the schedules for the courses in the list as Schedule objects
+	def getSchedules(self):
+		return [self.sectionTable.materialize(indices) for indices in self.iterCompactSchedules()]
+
+	# Return the number of schedules for the courses in the list
+	def count(self):
+		if not self.courseNums:
+			return 0
+		depth = len(self.__levels) - 1
+		if depth == len(self.__groups):
+			return len(self.__levels[-1])
+		return ScheduleBuilder.countExtendedSchedules(self.sectionTable, self.__groups[depth:], self.__levels[-1])
+
+	# Function to make the schedules include changes to the sections (e.g. updated seat counts) the next time they are
+	# encoded
+	def sectionsChanged(self):
+		self.sectionTable.clearJSONCache()
+
+	# Helper function to store the schedules for the prefixes that aren't stored yet, stopping before the number of
+	# stored schedules would go over maxStoredSchedules
+	def __extendLevels(self):
+		while len(self.__levels) <= len(self.__groups):
+			limit = IncrementalScheduleBuilder.maxStoredSchedules - self.__storedSchedules
+			group = self.__groups[len(self.__levels) - 1]
+			extended = list(itertools.islice(self.__extend(self.__levels[-1], group), limit + 1))
+			if len(extended) > limit:
+				return
+			self.__levels.append(extended)
+			self.__storedSchedules += len(extended)
+
+	# Helper generator that yields every schedule in schedules extended with each compatible section of group
+	def __extend(self, schedules, group):
+		for placed in schedules:
+			yield from ScheduleBuilder.iterExtendedSchedules(self.sectionTable, [group], placed)
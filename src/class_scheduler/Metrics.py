@@ -0,0 +1,181 @@
+# Metrics.py
+# This module collects optional performance metrics: counters and timers reported by the code on the hot paths
+# (downloading and parsing Class Search pages, the caches, and the schedule search)
+# Metrics are off by default, and while they are off every function here returns right away, so instrumented code only
+# pays for a function call; call enable() to start collecting them
+# Metrics are kept for the whole process (see getMetrics), and also for the request the current thread is handling, if
+# one was started with startRequest
+
+import collections
+import threading
+import time
+
+# Number of finished requests whose metrics are kept
+recentRequestCount = 100
+
+__enabled = False
+__lock = threading.Lock()
+__counters = {}
+__timers = {}
+__recentRequests = collections.deque(maxlen=recentRequestCount)
+__local = threading.local()
+
+# RequestMetrics
+# This class holds the metrics reported while handling one request
+# Member variables:
+# description: a description of the request (e.g. its url)
+# started: the time at which the request started, in seconds since the epoch
+# seconds: the number of seconds the request took, or None if it hasn't finished
+# counters: a dictionary of counter names and values
+# timers: a dictionary of timer names and [count, total seconds, most seconds] lists
+class RequestMetrics(object):
+
+	# Constructor for RequestMetrics
+	def __init__(self, description):
+		self.description = description
+		self.started = time.time()
+		self.seconds = None
+		self.counters = {}
+		self.timers = {}
+
+	# Function to return the metrics in a JSON serializable format
+	def toDict(self):
+		return dict(description=self.description, started=self.started, seconds=self.seconds,
+		            counters=dict(self.counters), timers=_describeTimers(self.timers))
+
+# Function to start collecting metrics
+def enable():
+	global __enabled
+	__enabled = True
+
+# Function to stop collecting metrics; the metrics collected so far are kept
+def disable():
+	global __enabled
+	__enabled = False
+
+# Function to determine if metrics are being collected
+def isEnabled():
+	return __enabled
+
+# Function to discard every metric collected so far
+def reset():
+	with __lock:
+		__counters.clear()
+		__timers.clear()
+		__recentRequests.clear()
+
+# Function to add amount to a counter
+def increment(name, amount=1):
+	if not __enabled:
+		return
+
+	request = getattr(__local, "request", None)
+	with __lock:
+		__counters[name] = __counters.get(name, 0) + amount
+		if request is not None:
+			request.counters[name] = request.counters.get(name, 0) + amount
+
+# Function to add a measurement of seconds to a timer
+def addTime(name, seconds):
+	if not __enabled:
+		return
+
+	request = getattr(__local, "request", None)
+	with __lock:
+		__addToTimer(__timers, name, seconds)
+		if request is not None:
+			__addToTimer(request.timers, name, seconds)
+
+# Function to return a context manager that adds the time spent inside its with block to a timer
+# Ex. with Metrics.timer("classSearch.fetchDepartment"): ...
+def timer(name):
+	if not __enabled:
+		return __nullTimer
+	return __Timer(name)
+
+# Function to start collecting the metrics of a request handled by the current thread
+# Returns the RequestMetrics for the request, or None if metrics are off
+def startRequest(description):
+	if not __enabled:
+		return None
+	request = RequestMetrics(description)
+	__local.request = request
+	return request
+
+# Function to finish a request started with startRequest, and keep its metrics with the recently finished requests
+def finishRequest(request):
+	if request is None:
+		return
+	request.seconds = time.time() - request.started
+	__local.request = None
+	with __lock:
+		__recentRequests.append(request)
+
+# Function to wrap function so that the metrics it reports while running on another thread (e.g. in a
+# ThreadPoolExecutor) count toward the request of the current thread
+def bind(function):
+	request = getattr(__local, "request", None)
+	if request is None:
+		return function
+
+	def boundFunction(*args, **kwargs):
+		previousRequest = getattr(__local, "request", None)
+		__local.request = request
+		try:
+			return function(*args, **kwargs)
+		finally:
+			__local.request = previousRequest
+	return boundFunction
+
+# Function to return every metric collected so far in a JSON serializable format
+# Timers are reported as their count, total, mean and most seconds, and recent requests are listed oldest first
+def getMetrics():
+	with __lock:
+		return dict(enabled=__enabled, counters=dict(__counters), timers=_describeTimers(__timers),
+		            recentRequests=[request.toDict() for request in __recentRequests])
+
+# Helper function to turn a dictionary of timers into a JSON serializable dictionary
+def _describeTimers(timers):
+	described = {}
+	for name in timers:
+		count, totalSeconds, maxSeconds = timers[name]
+		described[name] = dict(count=count, totalSeconds=totalSeconds, meanSeconds=totalSeconds / count,
+		                       maxSeconds=maxSeconds)
+	return described
+
+# Helper function to add a measurement to a timer in a dictionary of timers
+def __addToTimer(timers, name, seconds):
+	entry = timers.get(name)
+	if entry is None:
+		timers[name] = [1, seconds, seconds]
+	else:
+		entry[0] += 1
+		entry[1] += seconds
+		entry[2] = max(entry[2], seconds)
+
+# Context manager returned by timer
+class __Timer(object):
+	__slots__ = ("name", "start")
+
+	def __init__(self, name):
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		addTime(self.name, time.perf_counter() - self.start)
+		return False
+
+# Context manager returned by timer while metrics are off
+class __NullTimer(object):
+	__slots__ = ()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		return False
+
+__nullTimer = __NullTimer()
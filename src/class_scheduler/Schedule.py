@@ -2,14 +2,33 @@
 # This class represents a class schedule containing Class objects and information about the schedule as a whole
 # Member variables:
 # classes: a list of Class objects that represent the classes in the schedule
+# sectionTable: an optional SectionTable containing every class that may be added to the schedule; when it is given,
+#   conflicts are looked up in the table's precomputed conflict bitsets instead of calling conflictsWith
+# Without a sectionTable, the schedule keeps a summary of the classes in it (the union of their time masks and a count of
+# their course numbers) for each class added, so that a class is checked against the summary (see
+# Class.conflictsWithOccupancy) rather than against each class, and removing the last class just drops its entry
 
 from src.class_scheduler.ClassSchedulerJSONEncoder import JSONEncoderInterface
 
 class Schedule(JSONEncoderInterface):
 
 	# Constructor for Schedule object
-	def __init__(self, classes=[]):
-		self.classes = classes
+	def __init__(self, classes=None, sectionTable=None):
+		self.classes = classes if classes is not None else []
+		self.sectionTable = sectionTable
+
+		# Stack of bitsets of the sections that conflict with the classes in the schedule, one entry per class added
+		self.__conflictMasks = [0]
+		if sectionTable is not None:
+			for section in self.classes:
+				index = sectionTable.indexOf(section)
+				self.__conflictMasks.append(self.__conflictMasks[-1] | sectionTable.conflicts[index])
+
+		# Stack of the unions of the time masks of the classes in the schedule, one entry per class added, and the number
+		# of classes of each course in the schedule
+		# They are only built when the first class is added or removed, since most schedules are never changed
+		self.__occupiedMasks = None
+		self.__courseCounts = None
 
 	# Function to calculate the earliest start time during the week
 	def calcEarliestStartTime(self):
@@ -32,20 +51,59 @@ class Schedule(JSONEncoderInterface):
 	# Function to add a class to the schedule
 	# Returns True if the class is successfully added, False otherwise
 	def addClass(self, newClass):
-		for section in self.classes:
-			if newClass.conflictsWith(section):
+		if self.sectionTable is not None:
+			index = self.sectionTable.indexOf(newClass)
+			conflictMask = self.__conflictMasks[-1]
+			if (conflictMask >> index) & 1:
 				return False
+			self.classes.append(newClass)
+			self.__conflictMasks.append(conflictMask | self.sectionTable.conflicts[index])
+			return True
+
+		if self.__occupiedMasks is None:
+			self.__buildOccupancy()
+		occupiedMask = self.__occupiedMasks[-1]
+		conflict = newClass.conflictsWithOccupancy(occupiedMask, self.__courseCounts)
+		if conflict is None:
+			conflict = any(newClass.conflictsWith(section) for section in self.classes)
+		if conflict:
+			return False
 		self.classes.append(newClass)
+		self.__occupiedMasks.append(occupiedMask | newClass.timeMask)
+		self.__courseCounts[newClass.courseNum] = self.__courseCounts.get(newClass.courseNum, 0) + 1
 		return True
 
 	# Remove the last class added to the schedule
 	def removeLastClass(self):
-		self.classes = self.classes[:-1]
+		if not self.classes:
+			return
+		if self.sectionTable is not None:
+			self.classes.pop()
+			self.__conflictMasks.pop()
+			return
+
+		if self.__occupiedMasks is None:
+			self.__buildOccupancy()
+		removedClass = self.classes.pop()
+		self.__occupiedMasks.pop()
+		count = self.__courseCounts[removedClass.courseNum] - 1
+		if count:
+			self.__courseCounts[removedClass.courseNum] = count
+		else:
+			del self.__courseCounts[removedClass.courseNum]
 
 	# Return the number of classes in the schedule
 	def size(self):
 		return len(self.classes)
 
+	# Helper function to build the occupied time masks and course counts for the classes already in the schedule
+	def __buildOccupancy(self):
+		self.__occupiedMasks = [0]
+		self.__courseCounts = {}
+		for section in self.classes:
+			self.__occupiedMasks.append(self.__occupiedMasks[-1] | section.timeMask)
+			self.__courseCounts[section.courseNum] = self.__courseCounts.get(section.courseNum, 0) + 1
+
 	# Helper function to return the object in a JSON serializable format
 	def _toJSON(self):
 		return self.classes
@@ -1,36 +1,320 @@
 # ScheduleBuilder.py
-# This module contains a function to, given a list of course numbers, build a list of Schedule objects representing
+# This module contains functions to, given a list of course numbers, build (or stream) Schedule objects representing
 # all possible schedules that can be taken with the given courses
 
-from src.class_scheduler import Schedule, SectionList
+from src.class_scheduler import SectionList, SectionTable, Metrics
+from concurrent.futures import ProcessPoolExecutor
+import collections
+import itertools
+import heapq
 import logging
-import copy
+import os
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 # Return a tuple containing a list of Schedule objects representing all possible Schedules from the course numbers in the list,
 # and a list of errors
-def buildSchedules(parser, courseNumberList):
+# forwardChecking: use the constraint propagation search instead of the default search (see iterCompactSchedules)
+# constraints: an optional ScheduleConstraints; sections that break it are removed before the search starts
+def buildSchedules(parser, courseNumberList, forwardChecking=False, constraints=None):
+	errorsList = []
+	scheduleList = list(iterSchedules(parser, courseNumberList, errorsList=errorsList, forwardChecking=forwardChecking,
+	                                  constraints=constraints))
+	return (scheduleList, errorsList)
+
+# Generator that yields every possible Schedule from the course numbers in the list, one at a time
+# limit: the maximum number of schedules to yield, or None to yield all of them
+# errorsList: an optional list that errors are appended to while the courses are gathered
+# Courses are gathered when the first schedule is requested, so errorsList is only filled in once iteration has started
+# The Schedule objects share their Class objects with each other, so they should be treated as read-only
+def iterSchedules(parser, courseNumberList, limit=None, errorsList=None, forwardChecking=False, constraints=None):
+	if errorsList is None:
+		errorsList = []
+
+	sectionTable = buildSectionTable(parser, courseNumberList, errorsList, constraints)
+	for indices in iterCompactSchedules(sectionTable, limit, forwardChecking):
+		yield sectionTable.materialize(indices)
+
+# Return a tuple containing a SectionTable for the course numbers in the list, a list of compact schedules, and a list
+# of errors
+# Each compact schedule is a tuple of indices into the SectionTable; call materialize on the table to turn one into a
+# Schedule object
+def buildCompactSchedules(parser, courseNumberList, forwardChecking=False, constraints=None):
+	errorsList = []
+	sectionTable = buildSectionTable(parser, courseNumberList, errorsList, constraints)
+	return (sectionTable, list(iterCompactSchedules(sectionTable, forwardChecking=forwardChecking)), errorsList)
+
+# Generator that yields every possible schedule in sectionTable as a tuple of section indices, one at a time
+# limit: the maximum number of schedules to yield, or None to yield all of them
+# forwardChecking: when False, courses are visited in the order they were gathered, and each schedule lists its sections
+#   in the order they were placed
+#   When True, a constraint propagation search is used instead: the course with the fewest compatible sections left is
+#   placed next, and a branch is abandoned as soon as any remaining course has no compatible sections. It yields the
+#   same set of schedules in a different order, and each schedule lists its sections in ascending index order
+def iterCompactSchedules(sectionTable, limit=None, forwardChecking=False):
+	if not sectionTable.courses:
+		return
+
+	logger.info("Building schedules...")
+	stats = [0, 0] if Metrics.isEnabled() else None
+	if forwardChecking:
+		schedules = __searchConstrained(sectionTable.conflicts, __getCorecMasks(sectionTable),
+		                                [__getGroupMask(group) for group in sectionTable.courses], [], 0, stats)
+	else:
+		schedules = __searchTable(sectionTable.conflicts, sectionTable.corecs, __toPending(sectionTable.courses), [], 0,
+		                          stats)
+	if limit is not None:
+		schedules = itertools.islice(schedules, limit)
+	try:
+		yield from schedules
+	finally:
+		__reportSearchStats(stats)
+
+# Generator that yields every way to extend a compact schedule with a section of each course group in groups (and the
+# corecs of those sections), as tuples of section indices
+# placed: a compact schedule from sectionTable, which must not have any sections that conflict with each other
+# The groups must already be in sectionTable (see SectionTable.addCourse)
+def iterExtendedSchedules(sectionTable, groups, placed):
+	stats = [0, 0] if Metrics.isEnabled() else None
+	try:
+		yield from __searchTable(sectionTable.conflicts, sectionTable.corecs, __toPending(groups), list(placed),
+		                         sectionTable.conflictMaskFor(placed), stats)
+	finally:
+		__reportSearchStats(stats)
+
+# Generator that yields every possible schedule in sectionTable as a schedule template, one at a time
+# Sections of the same course with the same corecs that conflict with exactly the same sections (e.g. the sections of a
+# large lecture that only differ in CRN, professor or seats) are interchangeable in every schedule, so the search only
+# visits one section of each such equivalence class
+# A schedule template is a tuple with one entry per placed section, holding the indices of the interchangeable sections
+# at that position (the one visited by the search first); every choice of one index per entry is a compact schedule
+# (see expandTemplates)
+# limit: the maximum number of templates to yield, or None to yield all of them
+# Templates are yielded in the order iterCompactSchedules would find their first schedules
+def iterScheduleTemplates(sectionTable, limit=None):
+	if not sectionTable.courses:
+		return
+
+	logger.info("Building schedule templates...")
+	with Metrics.timer("search.collapseSections"):
+		courses, corecs, classes = __collapseTable(sectionTable)
+	Metrics.increment("search.equivalenceClasses", sum(1 for members in classes if members is not None))
+
+	stats = [0, 0] if Metrics.isEnabled() else None
+	schedules = __searchTable(sectionTable.conflicts, corecs, __toPending(courses), [], 0, stats)
+	if limit is not None:
+		schedules = itertools.islice(schedules, limit)
+	try:
+		for indices in schedules:
+			yield tuple(classes[index] for index in indices)
+	finally:
+		__reportSearchStats(stats)
+
+# Generator that yields the compact schedules of every schedule template in templates, in order
+# offset: the number of schedules to skip; a template is skipped without being expanded when all of its schedules are
+def expandTemplates(templates, offset=0):
+	for template in templates:
+		schedules = itertools.product(*template)
+		if offset:
+			size = countTemplate(template)
+			if offset >= size:
+				offset -= size
+				continue
+			schedules = itertools.islice(schedules, offset, None)
+			offset = 0
+		yield from schedules
+
+# Return the number of compact schedules a schedule template expands to
+def countTemplate(template):
+	count = 1
+	for members in template:
+		count *= len(members)
+	return count
+
+# Generator that yields every possible Schedule from the course numbers in the list, searching with several processes
+# Schedules are yielded in the same order as iterSchedules (see iterCompactSchedulesParallel for the other arguments)
+def iterSchedulesParallel(parser, courseNumberList, errorsList=None, maxWorkers=None, executor=None, constraints=None):
+	if errorsList is None:
+		errorsList = []
+
+	sectionTable = buildSectionTable(parser, courseNumberList, errorsList, constraints)
+	for indices in iterCompactSchedulesParallel(sectionTable, maxWorkers, executor):
+		yield sectionTable.materialize(indices)
+
+# Generator that yields every possible schedule in sectionTable as a tuple of section indices, searching with several
+# processes
+# The search tree is split on the sections of the first one or two courses, and each worker process receives only the
+# conflict bitsets and corec groups of the table (never the Class objects themselves)
+# maxWorkers: the number of worker processes to start, defaulting to the number of CPUs
+# executor: an optional concurrent.futures executor to reuse instead of starting a new process pool
+# Results are yielded in the same order as iterCompactSchedules, as soon as each part of the search is finished
+# Only a few parts are searched ahead of the caller, and closing the generator early cancels the parts that haven't
+# started (parts that are already running in a worker still finish, but aren't waited for)
+def iterCompactSchedulesParallel(sectionTable, maxWorkers=None, executor=None):
+	if not sectionTable.courses:
+		return
+
+	if executor is None:
+		executor = ProcessPoolExecutor(maxWorkers)
+		finished = False
+		try:
+			yield from iterCompactSchedulesParallel(sectionTable, maxWorkers, executor)
+			finished = True
+		finally:
+			executor.shutdown(wait=finished)
+		return
+
+	# Split the search into a few tasks per worker, so that uneven parts of the tree still keep every worker busy
+	workerCount = maxWorkers or os.cpu_count() or 1
+	tasks = __splitSearch(sectionTable, workerCount * 4)
+	chunkSize = max(1, len(tasks) // (workerCount * 4))
+	chunks = [tasks[start:start + chunkSize] for start in range(0, len(tasks), chunkSize)]
+
+	# Keep at most two chunks per worker submitted at a time, so that finished chunks don't pile up in memory while the
+	# caller is still consuming earlier ones
+	logger.info("Building schedules with {} tasks...".format(len(chunks)))
+	chunks = iter(chunks)
+	pending = collections.deque()
+	try:
+		for chunk in itertools.islice(chunks, workerCount * 2):
+			pending.append(executor.submit(__searchTasks, sectionTable.conflicts, sectionTable.corecs, chunk))
+		while pending:
+			scheduleList = pending.popleft().result()
+			for chunk in itertools.islice(chunks, 1):
+				pending.append(executor.submit(__searchTasks, sectionTable.conflicts, sectionTable.corecs, chunk))
+			yield from scheduleList
+	finally:
+		for future in pending:
+			future.cancel()
+
+# Return a tuple containing a list of the k best Schedule objects from the course numbers in the list, best first, and a
+# list of errors
+# objective: a ScheduleObjective used to rank the schedules (see ScheduleObjectives)
+def bestSchedules(parser, courseNumberList, k, objective, constraints=None):
+	errorsList = []
+	sectionTable = buildSectionTable(parser, courseNumberList, errorsList, constraints)
+	scheduleList = [sectionTable.materialize(indices) for indices in bestCompactSchedules(sectionTable, k, objective)]
+	return (scheduleList, errorsList)
+
+# Return a list of the k best schedules in sectionTable as tuples of section indices, best first
+# Schedules with equal cost are kept in the order the default search finds them
+# Only k schedules are held at a time, and a branch of the search is abandoned once the objective's bound shows that it
+# can't beat the k-th best schedule found so far
+def bestCompactSchedules(sectionTable, k, objective):
+	if not sectionTable.courses or k <= 0:
+		return []
+
+	logger.info("Building the {} best schedules...".format(k))
+	timeMasks = [section.timeMask for section in sectionTable.sections]
+	heap = []
+	stats = [0, 0] if Metrics.isEnabled() else None
+	__searchBest(sectionTable.conflicts, sectionTable.corecs, timeMasks, __toPending(sectionTable.courses), [], 0, 0,
+	             k, objective, heap, itertools.count(), stats)
+	__reportSearchStats(stats)
+	return [indices for (negativeCost, negativeOrder, indices) in sorted(heap, reverse=True)]
+
+# Return a tuple containing the number of possible schedules from the course numbers in the list, and a list of errors
+# No Schedule objects (or compact schedules) are built, so this is a cheap way to check how large a search will be
+def countSchedules(parser, courseNumberList, constraints=None):
+	errorsList = []
+	sectionTable = buildSectionTable(parser, courseNumberList, errorsList, constraints)
+	return (countCompactSchedules(sectionTable), errorsList)
+
+# Return the number of possible schedules in sectionTable
+# The count for the courses that are still open only depends on which of their sections are ruled out by the sections
+# already placed, so counts are memoized on that and shared between every branch of the search that reaches it
+def countCompactSchedules(sectionTable):
+	if not sectionTable.courses:
+		return 0
+	return countExtendedSchedules(sectionTable, sectionTable.courses, [()])
+
+# Return the number of ways to extend the compact schedules in placedList with a section of each course group in groups
+# (and the corecs of those sections), as iterExtendedSchedules would yield for each of them
+# The groups must already be in sectionTable, and counts are memoized across every schedule in placedList
+def countExtendedSchedules(sectionTable, groups, placedList):
+	# Give every course group an id, so that the list of open groups can be used as a dictionary key
+	groupIds = {}
+	allGroups = []
+	for group in itertools.chain(sectionTable.courses, *sectionTable.corecs):
+		if id(group) not in groupIds:
+			groupIds[id(group)] = len(allGroups)
+			allGroups.append(group)
+	corecIds = [tuple(groupIds[id(group)] for group in corecGroups) for corecGroups in sectionTable.corecs]
+
+	# The sections of a group, and of every corec that may be placed along with them, are the only sections whose
+	# conflicts matter while that group is open
+	reachMasks = [None] * len(allGroups)
+	for groupId in range(len(allGroups)):
+		__getReachMask(groupId, allGroups, corecIds, reachMasks)
+
+	logger.info("Counting schedules...")
+	pending = tuple(groupIds[id(group)] for group in groups)
+	memo = {}
+	count = 0
+	with Metrics.timer("search.count"):
+		for placed in placedList:
+			count += __countTable(sectionTable.conflicts, allGroups, corecIds, reachMasks, pending,
+			                      sectionTable.conflictMaskFor(placed), memo)
+	Metrics.increment("search.countMemoEntries", len(memo))
+	return count
+
+# Return a SectionTable holding every section (corecs included) of the course numbers in the list
+# Errors for courses that can't be found are appended to errorsList
+# constraints: an optional ScheduleConstraints; only the sections that satisfy it are added to the table, and errors are
+#   appended for courses (and corecs) left without any sections and for required CRNs that aren't in the table
+def buildSectionTable(parser, courseNumberList, errorsList, constraints=None):
+	with Metrics.timer("search.gatherSections"):
+		classList = __gatherSections(parser, courseNumberList, errorsList)
+
+	# Flatten every section into a table, so conflicts between sections are only computed once
+	logger.info("Computing section conflicts...")
+	sectionFilter = constraints.filterSections if constraints is not None and not constraints.isEmpty() else None
+	with Metrics.timer("search.buildSectionTable"):
+		sectionTable = SectionTable(classList, sectionFilter)
+	Metrics.increment("search.sections", sectionTable.size())
+
+	if sectionFilter is not None:
+		node = classList.head
+		for group in sectionTable.courses:
+			if not group:
+				errorsList.append("No sections of {} satisfy the constraints".format(node.sections[0].courseNum))
+			node = node.nextCourse
+		# A corec left without sections rules out every schedule too, so it is reported by its own course number
+		emptyCorecs = set()
+		for (index, corecGroups) in enumerate(sectionTable.corecs):
+			node = sectionTable.sections[index].corecs.head
+			for group in corecGroups:
+				if not group and node.sections:
+					emptyCorecs.add(node.sections[0].courseNum)
+				node = node.nextCourse
+		for courseNum in sorted(emptyCorecs):
+			errorsList.append("No sections of {} satisfy the constraints".format(courseNum))
+		crns = set(getattr(section, "crn", None) for section in sectionTable.sections)
+		for crn in sorted(constraints.requiredCrns - crns):
+			errorsList.append("CRN {} is not a section of the courses, or doesn't satisfy the constraints".format(crn))
+	return sectionTable
+
+# Helper function to retrieve the sections of every course in courseNumberList
+# Returns a SectionList where each node represents a course, and errors are appended to errorsList
+def __gatherSections(parser, courseNumberList, errorsList):
 	# Given the list of courses, retrieve the corresponding Course objects and compile them
 	# into a 2D list where each row represents a course, and columns are sections of each course
 
 	# Remove duplicates
 	courseNumberList = list(set(courseNumberList))
-	errorsList = []
 
 	# Build the two dimensional array of Class objects that will be used to create the schedules
 	classList = SectionList()
 	coursesAdded = set()
 	logger.info("Gathering course information...")
+	sectionsByCourse = parser.getAllSectionsForCourses(courseNumberList)
 	for courseNumberString in courseNumberList:
 		# Get sections of given course
-		sections = []
-		try:
-			sections = parser.getAllSectionsForCourse(courseNumberString)
-		except ValueError as e:
-			logger.exception(str(e))
-			errorsList.append(str(e))
+		sections = sectionsByCourse[courseNumberString]
+		if isinstance(sections, ValueError):
+			logger.error(str(sections))
+			errorsList.append(str(sections))
 			continue
 		if not sections:
 			errorsList.append("Course {} not found".format(courseNumberString))
@@ -44,44 +328,259 @@ def buildSchedules(parser, courseNumberList):
 			# Add corecs of course to coursesAdded set to avoid repeats
 			coursesAdded = coursesAdded.union(sections[0].corecs.courseNums)
 
-	if classList.isEmpty():
-		return ([], errorsList)
+	return classList
 
-	# Call a helper function to build the schedules
-	logger.info("Building schedules...")
-	schedule = Schedule()
-	scheduleList = []
-	__buildSchedules(schedule, scheduleList, classList.head)
-	return (scheduleList, errorsList)
+# Helper function to turn a list of course groups into the linked list of groups that the search functions expect
+# Each link is a tuple of (group, rest), and None marks the end of the list
+def __toPending(groups, pending=None):
+	for group in reversed(groups):
+		pending = (group, pending)
+	return pending
+
+# Helper generator for creating compact schedules
+# conflicts and corecs are the member variables of the same names from a SectionTable
+# pending: a linked list (see __toPending) of the course groups that still need a section
+# placed: a list of the indices of the sections in the current schedule
+# conflictMask: the bitset of every section that conflicts with a section in placed
+# stats: None, or a list of the number of search nodes visited and the number of sections considered so far, which is
+#   updated as the search runs (see __reportSearchStats)
+def __searchTable(conflicts, corecs, pending, placed, conflictMask, stats=None):
+
+	# Base Case: yield the schedule, and return up the recursion tree
+	if pending is None:
+		if stats is not None:
+			stats[0] += 1
+		yield tuple(placed)
+		return
+
+	# Recursive step: Walk through the sections of the next course, and if a section can be added to the schedule,
+	# add it, queue its corecs to be placed next, and recurse
+	group, rest = pending
+	if stats is not None:
+		stats[0] += 1
+		stats[1] += len(group)
+	for index in group:
+		if not (conflictMask >> index) & 1:
+			placed.append(index)
+			yield from __searchTable(conflicts, corecs, __toPending(corecs[index], rest), placed,
+			                         conflictMask | conflicts[index], stats)
+			placed.pop()
+
+# Helper function to group the sections of sectionTable into equivalence classes of interchangeable sections
+# Two sections are interchangeable when they have the same conflicts bitset (so they conflict with each other and with
+# the same other sections), the same corecs, and belong to the same course groups; swapping one for the other in any
+# schedule then gives another schedule, and the search below either of them is the same
+# Sections without a real meeting time (e.g. TBA) are only grouped if they conflict anyway, as sections of the same
+# course do for NDClass
+# Returns a tuple of the course groups and corecs (as in SectionTable) with only the first section of each class kept,
+# and a list with the tuple of the indices in each section's class for the first section of a class, or None
+def __collapseTable(sectionTable):
+	conflicts = sectionTable.conflicts
+	memberships = [set() for index in range(sectionTable.size())]
+	for group in itertools.chain(sectionTable.courses, *sectionTable.corecs):
+		groupKey = tuple(group)
+		for index in group:
+			memberships[index].add(groupKey)
+
+	classes = [None] * sectionTable.size()
+	firstIndices = {}
+	for index in range(sectionTable.size()):
+		key = (conflicts[index], tuple(tuple(group) for group in sectionTable.corecs[index]),
+		       frozenset(memberships[index]))
+		firstIndex = firstIndices.setdefault(key, index)
+		classes[firstIndex] = (classes[firstIndex] or ()) + (index,)
+
+	collapsedGroups = {}
+	def collapse(group):
+		collapsed = collapsedGroups.get(id(group))
+		if collapsed is None:
+			collapsed = collapsedGroups[id(group)] = [index for index in group if classes[index] is not None]
+		return collapsed
+
+	courses = [collapse(group) for group in sectionTable.courses]
+	corecs = [[collapse(group) for group in sectionTable.corecs[index]] if classes[index] is not None else None
+	          for index in range(sectionTable.size())]
+	return (courses, corecs, classes)
+
+# Helper function to add the statistics of a finished (or abandoned) search to the metrics
+# Every search node other than the root was reached by placing a section that was considered, so the rest of the
+# sections that were considered were pruned
+def __reportSearchStats(stats):
+	if stats is None:
+		return
+	nodes, considered = stats
+	Metrics.increment("search.nodes", nodes)
+	Metrics.increment("search.prunes", considered - max(0, nodes - 1))
 
-# Helper function for creating the list of Schedule objects
-def __buildSchedules(currentSchedule, scheduleList, classSectionListNode):
+# Helper function for finding the best schedules with branch and bound
+# conflicts, corecs, pending, placed and conflictMask are as in __searchTable
+# timeMasks: the timeMask of every section in the table
+# weekMask: the union of the time masks of the sections in placed
+# heap: the best schedules found so far, as (-cost, -order, indices) tuples so that heap[0] is the one to drop next
+# counter: an itertools.count used to remember the order in which schedules were found
+# stats: as in __searchTable
+def __searchBest(conflicts, corecs, timeMasks, pending, placed, conflictMask, weekMask, k, objective, heap, counter,
+                 stats=None):
+	if stats is not None:
+		stats[0] += 1
 
-	# Base Case: add the schedule to the schedule list, and return up the recursion tree
-	if classSectionListNode is None:
-		scheduleList.append(copy.deepcopy(currentSchedule))
+	# Base Case: keep the schedule if it is one of the k best so far
+	if pending is None:
+		cost = objective.cost(weekMask)
+		if len(heap) < k:
+			heapq.heappush(heap, (-cost, -next(counter), tuple(placed)))
+		elif cost < -heap[0][0]:
+			heapq.heapreplace(heap, (-cost, -next(counter), tuple(placed)))
 		return
 
-	# Recursive step: Walk through courses in current row, and if a course can be added to the schedule,
-	# add it, add its corecs, and recurse
-	for classSection in classSectionListNode.sections:
-		if currentSchedule.addClass(classSection):
-			if classSection.hasCorecs():
-				__buildSchedulesWithCorecs(currentSchedule, scheduleList, classSectionListNode.nextCourse, classSection.corecs.head)
-			else:
-				__buildSchedules(currentSchedule, scheduleList, classSectionListNode.nextCourse)
-			currentSchedule.removeLastClass()
-
-# Helper function for adding corecs into the current schedule
-def __buildSchedulesWithCorecs(currentSchedule, scheduleList, classSectionListNode, corecListNode):
-
-	# Base case:
-	if corecListNode is None:
-		__buildSchedules(currentSchedule, scheduleList, classSectionListNode)
+	# Recursive step: as in __searchTable, but skip any section whose partial schedule can't beat the k-th best
+	group, rest = pending
+	if stats is not None:
+		stats[1] += len(group)
+	for index in group:
+		if not (conflictMask >> index) & 1:
+			newWeekMask = weekMask | timeMasks[index]
+			if len(heap) == k and objective.bound(newWeekMask) >= -heap[0][0]:
+				continue
+			placed.append(index)
+			__searchBest(conflicts, corecs, timeMasks, __toPending(corecs[index], rest), placed,
+			             conflictMask | conflicts[index], newWeekMask, k, objective, heap, counter, stats)
+			placed.pop()
+
+# Helper function to split the search over sectionTable into independent tasks
+# Expands the first one or two levels of the search tree until there are at least taskCount tasks
+# Returns a list of (placed, pending, conflictMask) tuples in the order the default search would visit them
+def __splitSearch(sectionTable, taskCount):
+	conflicts = sectionTable.conflicts
+	corecs = sectionTable.corecs
+	tasks = [((), __toPending(sectionTable.courses), 0)]
+	for depth in range(2):
+		if len(tasks) >= taskCount:
+			break
+
+		nextTasks = []
+		for (placed, pending, conflictMask) in tasks:
+			if pending is None:
+				nextTasks.append((placed, pending, conflictMask))
+				continue
+			group, rest = pending
+			for index in group:
+				if not (conflictMask >> index) & 1:
+					nextTasks.append((placed + (index,), __toPending(corecs[index], rest), conflictMask | conflicts[index]))
+		tasks = nextTasks
+	return tasks
+
+# Helper function run by the worker processes of iterCompactSchedulesParallel
+# Runs the default search for every task in tasks (see __splitSearch) and returns a list of the schedules found
+def __searchTasks(conflicts, corecs, tasks):
+	scheduleList = []
+	for (placed, pending, conflictMask) in tasks:
+		scheduleList.extend(__searchTable(conflicts, corecs, pending, list(placed), conflictMask))
+	return scheduleList
+
+# Helper function to compute the bitset of every section in a group and in the corecs of its sections, recursively
+# reachMasks is a list, indexed by group id, that the results are stored in
+def __getReachMask(groupId, groups, corecIds, reachMasks):
+	if reachMasks[groupId] is not None:
+		return reachMasks[groupId]
+
+	reachMasks[groupId] = 0
+	mask = 0
+	for index in groups[groupId]:
+		mask |= 1 << index
+		for corecId in corecIds[index]:
+			mask |= __getReachMask(corecId, groups, corecIds, reachMasks)
+	reachMasks[groupId] = mask
+	return mask
+
+# Helper function for counting schedules
+# groups: every course group in the table, indexed by group id
+# corecIds: for every section, a tuple of the group ids of its corecs
+# reachMasks: for every group id, the bitset of sections that can be placed while that group is open
+# pending: a tuple of the ids of the groups that still need a section, in the order the default search places them
+# conflictMask: the bitset of every section that conflicts with a section already placed
+# memo: a dictionary of counts keyed on pending and the part of conflictMask that can still affect them
+def __countTable(conflicts, groups, corecIds, reachMasks, pending, conflictMask, memo):
+
+	# Base Case: every course has a section, so this is one schedule
+	if not pending:
+		return 1
+
+	reachMask = 0
+	for groupId in pending:
+		reachMask |= reachMasks[groupId]
+	key = (pending, conflictMask & reachMask)
+	try:
+		return memo[key]
+	except KeyError:
+		pass
+
+	# Recursive step: count the schedules for each section of the next course that can be placed
+	count = 0
+	rest = pending[1:]
+	for index in groups[pending[0]]:
+		if not (conflictMask >> index) & 1:
+			count += __countTable(conflicts, groups, corecIds, reachMasks, corecIds[index] + rest,
+			                      conflictMask | conflicts[index], memo)
+	memo[key] = count
+	return count
+
+# Helper function to return a bitset of the section indices in a course group
+def __getGroupMask(group):
+	mask = 0
+	for index in group:
+		mask |= 1 << index
+	return mask
+
+# Helper function to return, for every section in sectionTable, a list of bitsets of its corec course groups
+def __getCorecMasks(sectionTable):
+	return [[__getGroupMask(group) for group in corecGroups] for corecGroups in sectionTable.corecs]
+
+# Helper function to count the number of set bits in a bitset
+def __countBits(mask):
+	return bin(mask).count("1")
+
+# Helper generator for creating compact schedules with constraint propagation
+# conflicts: the member variable of the same name from a SectionTable
+# corecMasks: the bitsets of the corec course groups of every section (see __getCorecMasks)
+# openGroups: a list of bitsets, one for each course group that still needs a section
+# placed: a list of the indices of the sections in the current schedule
+# conflictMask: the bitset of every section that conflicts with a section in placed
+# stats: as in __searchTable
+def __searchConstrained(conflicts, corecMasks, openGroups, placed, conflictMask, stats=None):
+	if stats is not None:
+		stats[0] += 1
+
+	# Base Case: yield the schedule, and return up the recursion tree
+	if not openGroups:
+		yield tuple(sorted(placed))
 		return
 
-	# Recursive step: walk through sections for this course and add one to the schedule
-	for classSection in corecListNode.sections:
-		if currentSchedule.addClass(classSection):
-			__buildSchedulesWithCorecs(currentSchedule, scheduleList, classSectionListNode, corecListNode.nextCourse)
-			currentSchedule.removeLastClass()
+	# Choose the course with the fewest sections that are still compatible with the schedule
+	bestPosition = 0
+	bestCount = None
+	for position, groupMask in enumerate(openGroups):
+		count = __countBits(groupMask & ~conflictMask)
+		if count == 0:
+			return
+		if bestCount is None or count < bestCount:
+			bestPosition = position
+			bestCount = count
+	candidates = openGroups[bestPosition] & ~conflictMask
+	remainingGroups = openGroups[:bestPosition] + openGroups[bestPosition + 1:]
+	if stats is not None:
+		stats[1] += bestCount
+
+	# Recursive step: place each compatible section, and only recurse if every course that is still open (including the
+	# corecs of the new section) has at least one compatible section left
+	while candidates:
+		bit = candidates & -candidates
+		candidates ^= bit
+		index = bit.bit_length() - 1
+
+		newConflictMask = conflictMask | conflicts[index]
+		nextGroups = remainingGroups + corecMasks[index]
+		if all(groupMask & ~newConflictMask for groupMask in nextGroups):
+			placed.append(index)
+			yield from __searchConstrained(conflicts, corecMasks, nextGroups, placed, newConflictMask, stats)
+			placed.pop()
@@ -0,0 +1,73 @@
+# ScheduleConstraints.py
+# This class describes the limits a student puts on their schedules (times they want to keep free, whether they only
+# want sections with open seats, professors they want to avoid, and sections they must be in)
+# Every constraint applies to sections one at a time, so sections that break a constraint are removed before the search
+# starts (see filterSections), and the search never visits a schedule that would have to be thrown away afterwards
+# Member variables:
+# blockedTimes: a list of (day, startMinute, endMinute) tuples of times to keep free, in minutes after midnight
+# openSeatsOnly: whether sections without open seats are removed
+# excludedProfs: a set of the names of professors whose sections are removed, in lowercase
+# requiredCrns: a set of CRNs that must be in every schedule; when a course has sections with a required CRN, its other
+#   sections are removed
+
+class ScheduleConstraints(object):
+
+	# Constructor for ScheduleConstraints
+	def __init__(self, openSeatsOnly=False, excludedProfs=None, requiredCrns=None):
+		self.blockedTimes = []
+		self.openSeatsOnly = openSeatsOnly
+		self.excludedProfs = set(prof.strip().lower() for prof in (excludedProfs or []))
+		self.requiredCrns = set(crn.strip() for crn in (requiredCrns or []))
+
+	# Function to keep a time free on the given days (e.g. "MWF")
+	# Sections meeting at any time after the start and before the end are removed
+	def blockTime(self, days, startHour, startMin, endHour, endMin):
+		for day in days.upper():
+			self.blockedTimes.append((day, startHour * 60 + startMin, endHour * 60 + endMin))
+
+	# Function to keep whole days free (e.g. "F" for Fridays off)
+	def blockDays(self, days):
+		self.blockTime(days, 0, 0, 24, 0)
+
+	# Function to remove sections that meet before a time on the given days (e.g. no classes before 10am)
+	def blockBefore(self, hour, minute=0, days="MTWRFS"):
+		self.blockTime(days, 0, 0, hour, minute)
+
+	# Function to remove sections that meet after a time on the given days
+	def blockAfter(self, hour, minute=0, days="MTWRFS"):
+		self.blockTime(days, hour, minute, 24, 0)
+
+	# Function to determine if there are any constraints
+	def isEmpty(self):
+		return not (self.blockedTimes or self.openSeatsOnly or self.excludedProfs or self.requiredCrns)
+
+	# Function to determine if a section satisfies every constraint other than requiredCrns
+	def allows(self, section):
+		if self.openSeatsOnly and getattr(section, "openSpots", 1) <= 0:
+			return False
+		if self.excludedProfs and getattr(section, "profName", "").strip().lower() in self.excludedProfs:
+			return False
+
+		for day in section.classTimes:
+			classTime = section.classTimes[day]
+			if classTime.neverConflict:
+				continue
+			startMinute = classTime.startTime.hour * 60 + classTime.startTime.minute
+			endMinute = classTime.endTime.hour * 60 + classTime.endTime.minute
+			for (blockedDay, blockedStart, blockedEnd) in self.blockedTimes:
+				if blockedDay == day.upper() and startMinute < blockedEnd and endMinute > blockedStart:
+					return False
+		return True
+
+	# Function to return the sections of one course that may be placed in a schedule, as a list
+	# sections is a Python list of Class objects from the same course
+	def filterSections(self, sections):
+		required = [section for section in sections if getattr(section, "crn", None) in self.requiredCrns]
+		if required:
+			sections = required
+		return [section for section in sections if self.allows(section)]
+
+	# Function to return a hashable value that is equal for equal constraints (e.g. for use in a cache key)
+	def getKey(self):
+		return (tuple(sorted(self.blockedTimes)), self.openSeatsOnly, tuple(sorted(self.excludedProfs)),
+		        tuple(sorted(self.requiredCrns)))
@@ -0,0 +1,73 @@
+# ScheduleObjectives.py
+# This module defines the objectives that ScheduleBuilder.bestSchedules can use to rank schedules
+# Every objective scores a schedule from its week bitmask (the union of the timeMask of each of its classes), so a
+# score can be updated incrementally as sections are added to or removed from a partial schedule
+
+from abc import ABC, abstractmethod
+from src.class_scheduler.ClassTime import getDayMasks, SLOTS_PER_DAY
+
+# ScheduleObjective
+# This class is used to define functionality that other objectives must implement
+# Costs are minimized, so an objective that prefers larger values should return their negation
+class ScheduleObjective(ABC):
+
+	# Function to return the cost of a complete schedule with the given week bitmask
+	@abstractmethod
+	def cost(self, weekMask):
+		raise NotImplementedError
+
+	# Function to return a lower bound on the cost of every complete schedule that can be built by adding sections to a
+	# partial schedule with the given week bitmask
+	# The default implementation is only correct for objectives whose cost can never decrease as sections are added
+	def bound(self, weekMask):
+		return self.cost(weekMask)
+
+# LatestStartObjective
+# Prefers schedules whose earliest class during the week starts as late as possible
+class LatestStartObjective(ScheduleObjective):
+	def cost(self, weekMask):
+		dayMasks = [dayMask for dayMask in getDayMasks(weekMask) if dayMask]
+		if not dayMasks:
+			return -SLOTS_PER_DAY
+		return -min((dayMask & -dayMask).bit_length() - 1 for dayMask in dayMasks)
+
+# EarliestEndObjective
+# Prefers schedules whose last class during the week ends as early as possible
+class EarliestEndObjective(ScheduleObjective):
+	def cost(self, weekMask):
+		dayMasks = getDayMasks(weekMask)
+		if not dayMasks:
+			return 0
+		return max(dayMask.bit_length() for dayMask in dayMasks)
+
+# FewestDaysObjective
+# Prefers schedules with classes on as few days of the week as possible
+class FewestDaysObjective(ScheduleObjective):
+	def cost(self, weekMask):
+		return sum(1 for dayMask in getDayMasks(weekMask) if dayMask)
+
+# LeastTimeOnCampusObjective
+# Prefers schedules with the least time between the first and last class of each day, summed over the week
+class LeastTimeOnCampusObjective(ScheduleObjective):
+	def cost(self, weekMask):
+		total = 0
+		for dayMask in getDayMasks(weekMask):
+			if dayMask:
+				total += dayMask.bit_length() - ((dayMask & -dayMask).bit_length() - 1)
+		return total
+
+# FewestGapsObjective
+# Prefers schedules with the least free time between classes on the same day, summed over the week
+# A later section can fill a gap, so partial schedules can't be bounded by their own gaps; this objective only limits
+# the number of schedules held in memory and does not prune the search
+class FewestGapsObjective(ScheduleObjective):
+	def cost(self, weekMask):
+		total = 0
+		for dayMask in getDayMasks(weekMask):
+			if dayMask:
+				span = dayMask.bit_length() - ((dayMask & -dayMask).bit_length() - 1)
+				total += span - bin(dayMask).count("1")
+		return total
+
+	def bound(self, weekMask):
+		return 0
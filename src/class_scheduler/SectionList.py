@@ -17,6 +17,8 @@
 class SectionList(object):
 
 	class SectionListNode(object):
+		__slots__ = ("sections", "nextCourse")
+
 		# Constructor for SectionListNode
 		# Accepts a Python list of Class objects for the same course as a parameter
 		# The above condition is not enforced. The programmer must ensure all Class objects are for same course
@@ -0,0 +1,125 @@
+# SectionTable.py
+# This class flattens every section in a SectionList (corecs included) into a single indexed table, and precomputes
+# which sections conflict with each other so that the schedule search never has to call conflictsWith itself
+# Member variables:
+# sections: a list of Class objects; a section's position in this list is its index
+# conflicts: a list of integer bitsets, one per section; bit j of conflicts[i] is set if sections i and j conflict
+#   (every section conflicts with itself)
+# courses: a list of course groups, one per course added with addCourse; each group is a list of section indices
+# corecs: a list with one entry per section, holding a list of course groups (one per corec of that section)
+# sectionFilter: the function used to choose which sections of each course are added, or None to add all of them
+# Each section's JSON is cached the first time it is encoded (see sectionToJSON), until clearJSONCache is called
+# The table is shared by every compact schedule (a tuple of section indices) built from it; courses may be added later
+# (see IncrementalScheduleBuilder), since that never changes the index of a section or whether two sections conflict,
+# but nothing should be added while a search of the table is running
+
+from src.class_scheduler.Schedule import Schedule
+
+class SectionTable(object):
+
+	# Constructor for SectionTable
+	# sectionList is an optional SectionList whose courses should be added to the table in order
+	# sectionFilter is an optional function that is given the Python list of sections of each course (corecs included)
+	#   before it is added, and returns the list of those sections to add (e.g. ScheduleConstraints.filterSections)
+	def __init__(self, sectionList=None, sectionFilter=None):
+		self.sectionFilter = sectionFilter
+		self.sections = []
+		self.conflicts = []
+		self.courses = []
+		self.corecs = []
+		self.__indices = {}
+		self.__json = []
+		if sectionList is not None:
+			node = sectionList.head
+			while node is not None:
+				self.addCourse(node.sections)
+				node = node.nextCourse
+
+	# Function to add a course (and, recursively, the corecs of each of its sections) to the table
+	# sections is a Python list of Class objects from the same course
+	# Returns the course group (a list of section indices) that was added
+	def addCourse(self, sections):
+		group = self.__addGroup(sections)
+		self.courses.append(group)
+		return group
+
+	# Function to return the index of a section in the table
+	# Raises a KeyError if the section was never added
+	def indexOf(self, section):
+		return self.__indices[id(section)]
+
+	# Function to return the bitset of every section that conflicts with any section in indices
+	def conflictMaskFor(self, indices):
+		mask = 0
+		for index in indices:
+			mask |= self.conflicts[index]
+		return mask
+
+	# Function to determine if two sections in the table conflict
+	def conflictsWith(self, index, otherIndex):
+		return (self.conflicts[index] >> otherIndex) & 1 == 1
+
+	# Function to turn a compact schedule (a sequence of section indices) into a Schedule object
+	# The Class objects in the returned Schedule are shared with the table rather than copied
+	def materialize(self, indices):
+		return Schedule([self.sections[index] for index in indices])
+
+	# Function to return the JSON string of a section in the table
+	# The string is only built once per section, no matter how many schedules the section appears in
+	def sectionToJSON(self, index):
+		sectionJSON = self.__json[index]
+		if sectionJSON is None:
+			sectionJSON = self.__json[index] = self.sections[index].toJSON()
+		return sectionJSON
+
+	# Function to forget the cached JSON of every section, so that changes to the sections (e.g. updated seat counts) are
+	# included the next time they are encoded
+	def clearJSONCache(self):
+		self.__json = [None] * len(self.sections)
+
+	# Return the number of sections in the table
+	def size(self):
+		return len(self.sections)
+
+	# Helper function to add the sections of one course to the table and return their indices
+	# Sections that are already in the table (e.g. a corec list shared by several sections) keep their old index
+	def __addGroup(self, sections):
+		if self.sectionFilter is not None:
+			sections = self.sectionFilter(sections)
+		group = []
+		for section in sections:
+			group.append(self.__addSection(section))
+		for index in group:
+			if self.corecs[index] is None:
+				self.corecs[index] = []
+				self.__addCorecs(self.sections[index], self.corecs[index])
+		return group
+
+	# Helper function to add the corecs of a section to the table, appending their course groups to corecGroups
+	def __addCorecs(self, section, corecGroups):
+		node = section.corecs.head
+		while node is not None:
+			corecGroups.append(self.__addGroup(node.sections))
+			node = node.nextCourse
+
+	# Helper function to add a single section to the table, comparing it against every section already present
+	def __addSection(self, section):
+		try:
+			return self.__indices[id(section)]
+		except KeyError:
+			pass
+
+		index = len(self.sections)
+		bit = 1 << index
+		mask = bit
+		for otherIndex, other in enumerate(self.sections):
+			if section.conflictsWith(other):
+				mask |= 1 << otherIndex
+				self.conflicts[otherIndex] |= bit
+
+		self.__indices[id(section)] = index
+		self.sections.append(section)
+		self.conflicts.append(mask)
+		self.corecs.append(None)
+		self.__json.append(None)
+		return index
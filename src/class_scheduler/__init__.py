@@ -3,5 +3,10 @@ from .ClassTime import ClassTime, UndefinedClassTime
 from .CoursePageParser import CoursePageParser
 from .Schedule import Schedule
 from .SectionList import SectionList
+from .SectionTable import SectionTable
+from .ScheduleConstraints import ScheduleConstraints
+from . import Metrics
 from . import ScheduleBuilder
-from .ClassSchedulerJSONEncoder import ClassSchedulerJSONEncoder, JSONEncoderInterface
+from .IncrementalScheduleBuilder import IncrementalScheduleBuilder
+from . import ScheduleObjectives
+from .ClassSchedulerJSONEncoder import ClassSchedulerJSONEncoder, JSONEncoderInterface, ScheduleResultEncoder
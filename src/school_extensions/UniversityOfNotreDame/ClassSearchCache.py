@@ -0,0 +1,72 @@
+# ClassSearchCache.py
+# This module defines a persistent cache for pages downloaded from Class Search, so that a new parser (or a restarted
+# server) doesn't have to download every page again
+
+# ClassSearchCache:
+# This class stores pages in an SQLite database in a local directory
+# Each page is keyed by the term, the kind of page (e.g. department tables or course pages), and a key within that kind
+# (e.g. the department or the url of the course page)
+# Instance variables:
+# path: the path of the SQLite database
+# ttl: the number of seconds for which a stored page is considered fresh
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+class ClassSearchCache(object):
+	databaseName = "ClassSearchCache.sqlite3"
+
+	logger = logging.getLogger(__name__)
+	logger.setLevel(logging.DEBUG)
+
+	# Constructor for ClassSearchCache
+	# directory is created if it doesn't exist yet
+	def __init__(self, directory, ttl=3600):
+		os.makedirs(directory, exist_ok=True)
+		self.path = os.path.join(directory, ClassSearchCache.databaseName)
+		self.ttl = ttl
+		# SQLite connections can't be shared between threads, so each thread opens its own
+		self.__local = threading.local()
+		with self.__getConnection() as connection:
+			connection.execute("CREATE TABLE IF NOT EXISTS pages (term TEXT, kind TEXT, key TEXT, fetched REAL, "
+			                   "content BLOB, PRIMARY KEY (term, kind, key))")
+
+	# Return the stored content of a page, or None if the page isn't stored or is older than the ttl
+	def get(self, term, kind, key):
+		row = self.__getConnection().execute("SELECT fetched, content FROM pages WHERE term = ? AND kind = ? AND key = ?",
+		                                     (term, kind, key)).fetchone()
+		if row is None or time.time() - row[0] > self.ttl:
+			ClassSearchCache.logger.debug("{} {} for term {} not found in disk cache...".format(kind, key, term))
+			return None
+		return row[1]
+
+	# Store the content of a page, replacing any older copy
+	def put(self, term, kind, key, content):
+		with self.__getConnection() as connection:
+			connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+			                   (term, kind, key, time.time(), content))
+
+	# Remove stored pages for a term
+	# If kind is given only pages of that kind are removed, and if key is also given only that page is removed
+	def invalidate(self, term, kind=None, key=None):
+		query = "DELETE FROM pages WHERE term = ?"
+		parameters = [term]
+		if kind is not None:
+			query += " AND kind = ?"
+			parameters.append(kind)
+			if key is not None:
+				query += " AND key = ?"
+				parameters.append(key)
+		with self.__getConnection() as connection:
+			connection.execute(query, parameters)
+
+	# Helper function to return the SQLite connection for the current thread
+	def __getConnection(self):
+		connection = getattr(self.__local, "connection", None)
+		if connection is None:
+			connection = sqlite3.connect(self.path)
+			self.__local.connection = connection
+		return connection
@@ -0,0 +1,67 @@
+# ClassSearchHTML.py
+# This module contains functions to pull the data that NDClassSearchParser needs out of Class Search pages
+# Only the table holding the data is parsed (using a SoupStrainer), lxml is used as the parser when it is installed,
+# and the data is copied into plain tuples and strings so that no parse tree is kept alive afterwards
+
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+	import lxml
+	HTML_PARSER = "lxml"
+except ImportError:
+	HTML_PARSER = "html.parser"
+
+__resultTableStrainer = SoupStrainer('table', attrs={'id':'resulttable'})
+__detailsTableStrainer = SoupStrainer('table', attrs={'class':'datadisplaytable'})
+__resultTablePattern = re.compile(b'<table[^>]*resulttable', re.IGNORECASE)
+__detailsTablePattern = re.compile(b'<table[^>]*datadisplaytable', re.IGNORECASE)
+
+# Function to determine, without parsing the page, if a Class Search page has a results table
+def hasResultTable(content):
+	return __resultTablePattern.search(__toBytes(content)) is not None
+
+# Function to determine, without parsing the page, if a course page has a details table
+def hasCourseDetails(content):
+	return __detailsTablePattern.search(__toBytes(content)) is not None
+
+# Function to return the rows of the results table on a Class Search page
+# Each row is a tuple of the text of every cell in the row, followed by the markup of the first link in the first cell
+# Returns None if the page has no results table (e.g. when an invalid department was searched)
+def parseResultRows(content):
+	soup = BeautifulSoup(content, HTML_PARSER, parse_only=__resultTableStrainer)
+	table = soup.find('table', {'id':'resulttable'})
+	table = table.find('tbody') if table is not None else None
+	if table is None:
+		soup.decompose()
+		return None
+
+	rows = []
+	for row in table.findAll('tr'):
+		cells = row.findAll('td')
+		if not cells:
+			continue
+		link = cells[0].find('a')
+		rows.append(tuple(cell.text for cell in cells) + (str(link) if link is not None else "",))
+
+	soup.decompose()
+	return rows
+
+# Function to return the contents of the first cell of the details table on a course page
+# Returns a tuple containing a tuple of the text of every field label in the cell, and the text of the whole cell
+# Returns None if the page has no details table
+def parseCourseDetails(content):
+	soup = BeautifulSoup(content, HTML_PARSER, parse_only=__detailsTableStrainer)
+	table = soup.find('table', {'class':'datadisplaytable'})
+	cell = table.find('td') if table is not None else None
+	if cell is None:
+		soup.decompose()
+		return None
+
+	details = (tuple(span.text for span in cell.findAll('span', {'class':'fieldlabeltext'})), cell.text)
+	soup.decompose()
+	return details
+
+# Helper function to return the content of a page as bytes
+def __toBytes(content):
+	return content.encode() if isinstance(content, str) else content
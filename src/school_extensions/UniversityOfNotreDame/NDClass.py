@@ -19,6 +19,7 @@ logger.setLevel(logging.DEBUG)
 
 #Class to represent a section of a course at Notre Dame
 class NDClass(Class):
+	__slots__ = ("crn", "profName", "openSpots", "totalSpots", "coursePageLink")
 
 	#Constructor for Class object
 	def __init__(self, name, courseNum, sectionNum, classTimes, crn="00000", profName = "", openSpots=0, totalSpots=0,
@@ -29,7 +30,7 @@ class NDClass(Class):
 		self.openSpots = openSpots
 		self.totalSpots = totalSpots
 		self.coursePageLink = coursePageLink
-		logger.info("Creating Class instance for {}-{}...".format(courseNum, sectionNum))
+		logger.debug("Creating Class instance for {}-{}...".format(courseNum, sectionNum))
 
 	# Function to determine if two classes conflict
 	# Returns true if the classes conflict in their times, or if the two classes are from the same course
@@ -37,10 +38,9 @@ class NDClass(Class):
 		if self.courseNum == otherClass.courseNum:
 			return True
 
-		for day in self.classTimes:
-			try:
-				if self.classTimes[day].conflictsWith(otherClass.classTimes[day]):
-					return True
-			except KeyError:
-				pass
-		return False
\ No newline at end of file
+		return self.timesConflictWith(otherClass)
+
+	# Function to determine if the class conflicts with a schedule from a summary of the classes in it
+	# Returns true if the class overlaps a time occupied by the schedule, or if the schedule has a class of the same course
+	def conflictsWithOccupancy(self, occupiedMask, courseCounts):
+		return self.courseNum in courseCounts or (self.timeMask & occupiedMask) != 0
\ No newline at end of file
@@ -1,5 +1,6 @@
 # NDClassSearchParser.py
-# This module contains two classes: NDClassSearchParser and NDClassSearchParserWithCaching
+# This module contains two classes: NDClassSearchParser and NDClassSearchParserWithCaching, and the SectionRecord type
+# they use to hold parsed Class Search rows
 
 # NDClassSearchParser:
 # This class is used to scrape Notre Dame's Class Search website to pull class information and organize it
@@ -7,14 +8,33 @@
 # url: the url of the Class Search page
 # Instance Variables:
 # term: the term for which the user wishes to choose classes
+# maxConcurrentRequests: the maximum number of pages that are downloaded from Class Search at the same time, across
+#   every request using the parser
+# requestTimeout: the number of seconds to wait for Class Search to connect or to send data before a download fails
+# session: a requests.Session, so that connections to Class Search are kept alive and reused between requests
+# corecCourseNumsCache: a dictionary with the url of a course page as the key and a tuple of the corec course numbers
+#   listed on that page as the value
+# corecSectionsCache: a dictionary with a (term, course number) tuple as the key and a tuple of the sections of that
+#   corec as the value
+# corecListCache: a dictionary with a tuple of corec course numbers as the key and the SectionList shared by every
+#   section with those corecs as the value
 
 from bs4 import BeautifulSoup
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import re
-from . import NDClass
-from src.class_scheduler import CoursePageParser, ClassTime, UndefinedClassTime
+import threading
+from . import NDClass, ClassSearchCache, ClassSearchHTML
+from src.class_scheduler import CoursePageParser, ClassTime, UndefinedClassTime, SectionList, Metrics
 import logging
 
+# SectionRecord:
+# A record of the fields parsed from one row of a Class Search table, used to build NDClass objects without going back
+# to the HTML
+SectionRecord = namedtuple("SectionRecord", ["name", "sectionNum", "crn", "profName", "classTimes", "openSpots",
+                                             "totalSpots", "coursePageLink"])
+
 class NDClassSearchParser(CoursePageParser):
 	classSearchURL = 'https://class-search.nd.edu/reg/srch/ClassSearchServlet'
 
@@ -25,9 +45,19 @@ class NDClassSearchParser(CoursePageParser):
 	#Takes a term and a cacheTables flag as inputs
 	#The cacheTables flag will save the table for each department in memory so
 	#it doesn't have to be retrieved again if needed
-	def __init__(self, term=None):
+	def __init__(self, term=None, maxConcurrentRequests=8, requestTimeout=30):
 		NDClassSearchParser.logger.info("Creating NDClassSearchParser instance...")
+		self.maxConcurrentRequests = maxConcurrentRequests
+		self.requestTimeout = requestTimeout
+		self.session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_maxsize=maxConcurrentRequests)
+		self.session.mount('https://', adapter)
+		self.session.mount('http://', adapter)
+		self.__requestSlots = threading.BoundedSemaphore(maxConcurrentRequests)
 		self.term = term if term else self.__getMostRecentTerm()
+		self.corecCourseNumsCache = {}
+		self.corecSectionsCache = {}
+		self.corecListCache = {}
 
 
 	######Public facing functions#####
@@ -35,55 +65,90 @@ class NDClassSearchParser(CoursePageParser):
 
 	#Retrieve table row in ClassSearch for each section of given class
 	#The variable courseNumberString is the department identifier combined with the five-digit number (e.g. CSE30331)
-	#Raises a ValueError when the course number can't be parsed, the department is invalid, or the course can't be found.
+	#Raises a ValueError when the course number can't be parsed, the department is invalid, or the course or one of its
+	#corecs can't be found
 	#I'm not sure if the addCorecs flag is the correct way to handle the infinite loop issue, but it's the best
 	#solution that I have for now
 	def getAllSectionsForCourse(self, courseNumberString, addCorecs=True):
 
-		courseNumberString = NDClassSearchParser.__sanitizeCourseNumber(courseNumberString)
-
-		#Determine which department the course is in
-		try:
-			dept, num = NDClassSearchParser.__parseCourseNumber(courseNumberString)
-		except AttributeError as e:
-			raise
+		courseNumberString, dept = NDClassSearchParser.__parseCourse(courseNumberString)
 
 		try:
-			table = self._getClassSearchTable(dept)
+			departmentIndex = self._getDepartmentIndex(dept)
 		except ValueError as e:
 			raise
 
-		#Fill two dimensional array with info for each section of given class
-		sectionsHTML = []
-		for row in table.findAll('tr'):
-			cells = row.findAll('td')
-			if re.match(courseNumberString, cells[0].text):
-				sectionsHTML.append(cells)
+		sections = self.__buildSections(courseNumberString, departmentIndex)
+		if addCorecs:
+			self.__populateAllCorecs(sections)
 
-		if not sectionsHTML:
-			raise ValueError("Course {} not found".format(courseNumberString))
+		NDClassSearchParser.logger.info("Returning all sections for {}...".format(courseNumberString))
+		return sections
 
-		#Create class objects for each class
-		sections = []
-		for section in sectionsHTML:
-			courseName = section[1].text
-			crn = section[7].text
-			sectionNum = NDClassSearchParser.__getSectionNumber(section[0].text)
-			profName = NDClassSearchParser.__sanitizeProf(section[9].text)
+	#Retrieve the sections of several courses at once, with corecs
+	#Department tables and course pages are downloaded concurrently, at most maxConcurrentRequests at a time
+	#Returns a dictionary with each course number in courseNumberList as a key, and either the list of sections for that
+	#course or the ValueError that getAllSectionsForCourse would have raised as the value
+	def getAllSectionsForCourses(self, courseNumberList):
+		results = {}
+		courses = {}
+		for courseNumberString in courseNumberList:
 			try:
-				classTimes = NDClassSearchParser.__getClassTimes(section[10].text)
-			except ValueError:
-				classTimes = {"U":UndefinedClassTime()}
-			openSpots = int(section[5].text)
-			totalSpots = int(section[4].text)
-			coursePageLink = self.__extractLinkToCoursePage(section[0])
-			newClass = NDClass.NDClass(courseName, courseNumberString, sectionNum, classTimes, crn, profName, openSpots, totalSpots, coursePageLink)
-			if addCorecs:
-				self._populateCorecs(newClass)
-			sections.append(newClass)
+				courses[courseNumberString] = NDClassSearchParser.__parseCourse(courseNumberString)
+			except ValueError as e:
+				results[courseNumberString] = e
+
+		#Download the table for every department involved at the same time
+		with ThreadPoolExecutor(self.maxConcurrentRequests) as executor:
+			indexFutures = {}
+			for (sanitizedCourseNumber, dept) in courses.values():
+				if dept not in indexFutures:
+					indexFutures[dept] = executor.submit(Metrics.bind(self._getDepartmentIndex), dept)
+
+		sectionsByCourse = {}
+		for courseNumberString in courses:
+			sanitizedCourseNumber, dept = courses[courseNumberString]
+			try:
+				sectionsByCourse[courseNumberString] = self.__buildSections(sanitizedCourseNumber,
+				                                                            indexFutures[dept].result())
+			except ValueError as e:
+				results[courseNumberString] = e
+
+		#Download the course pages of every course at the same time, then populate the corecs of each course on its own,
+		#so that a corec that can't be found is only reported for the courses that list it
+		coursePages = self.__fetchCoursePages(
+			[section for sections in sectionsByCourse.values() for section in sections])
+		for courseNumberString in sectionsByCourse:
+			sections = sectionsByCourse[courseNumberString]
+			try:
+				for section in sections:
+					self._populateCorecs(section, coursePages.get(section.coursePageLink))
+			except ValueError as e:
+				results[courseNumberString] = e
+				continue
+			results[courseNumberString] = sections
+
+		NDClassSearchParser.logger.info("Returning all sections for {} courses...".format(len(courseNumberList)))
+		return results
+
+	#Return the department of a course number (e.g. CSE for CSE30331)
+	#Raises a ValueError when the course number can't be parsed
+	@staticmethod
+	def getDepartment(courseNumberString):
+		return NDClassSearchParser.__parseCourse(courseNumberString)[1]
 
-		NDClassSearchParser.logger.info("Returning all sections for {}...".format(courseNumberString))
-		return sections
+	#Retrieve the identifiers of every department listed on Class Search (e.g. CSE, MATH)
+	def getDepartments(self):
+		with self.__requestSlots:
+			response = self.session.post(self.classSearchURL, timeout=self.requestTimeout)
+		soup = BeautifulSoup(response.content, ClassSearchHTML.HTML_PARSER)
+
+		options = soup.find('select', {'name':'SUBJ'}).findAll('option')
+		departments = [option['value'] for option in options]
+		soup.decompose()
+
+		NDClassSearchParser.logger.debug("Found {} departments...".format(len(departments)))
+		return departments
 
 
 
@@ -91,23 +156,95 @@ class NDClassSearchParser(CoursePageParser):
 
 
 
+	# Helper function to sanitize a course number and find its department
+	# Returns a tuple of the sanitized course number and the department
+	# Raises a ValueError when the course number can't be parsed
+	@staticmethod
+	def __parseCourse(courseNumberString):
+		courseNumberString = NDClassSearchParser.__sanitizeCourseNumber(courseNumberString)
+
+		#Determine which department the course is in
+		dept, num = NDClassSearchParser.__parseCourseNumber(courseNumberString)
+		return (courseNumberString, dept)
+
+	# Helper function to create NDClass objects (without corecs) for every section of a course in departmentIndex
+	# Raises a ValueError if the course can't be found
+	def __buildSections(self, courseNumberString, departmentIndex):
+		records = departmentIndex.get(courseNumberString)
+		if not records:
+			raise ValueError("Course {} not found".format(courseNumberString))
+
+		#Create class objects for each class
+		sections = []
+		with Metrics.timer("classSearch.buildSections"):
+			for record in records:
+				newClass = NDClass.NDClass(record.name, courseNumberString, record.sectionNum, record.classTimes, record.crn,
+				                           record.profName, record.openSpots, record.totalSpots, record.coursePageLink)
+				sections.append(newClass)
+		Metrics.increment("classSearch.sectionsBuilt", len(sections))
+		return sections
+
+	# Helper function to populate the corecs of every Class object in sections
+	# Raises a ValueError if a corec can't be found
+	def __populateAllCorecs(self, sections):
+		coursePages = self.__fetchCoursePages(sections)
+		for section in sections:
+			self._populateCorecs(section, coursePages.get(section.coursePageLink))
+
+	# Helper function to download the course pages of every Class object in sections
+	# The pages are downloaded concurrently, at most maxConcurrentRequests at a time
+	# Pages whose corecs are already in corecCourseNumsCache are not downloaded again
+	# Returns a dictionary with the url of each downloaded page as the key and its content as the value
+	def __fetchCoursePages(self, sections):
+		links = []
+		for section in sections:
+			if section.coursePageLink not in self.corecCourseNumsCache and section.coursePageLink not in links:
+				links.append(section.coursePageLink)
+
+		coursePages = {}
+		if links:
+			with ThreadPoolExecutor(self.maxConcurrentRequests) as executor:
+				coursePages = dict(zip(links, executor.map(Metrics.bind(self._fetchCoursePage), links)))
+		return coursePages
+
 	# Helper function to populate the corequisites field for a specific Class object
 	# classObject is an object of the Class class
+	# coursePage is the content of the course page of classObject, if it has already been downloaded
 	# Does not return anything, but rather changes the corecs attribute of classObject
-	def _populateCorecs(self, classObject):
+	# Sections with the same corecs share a single SectionList (and the same corec Class objects), so the corecs of a
+	# section must not be modified afterwards
+	def _populateCorecs(self, classObject, coursePage=None):
 		try:
 			courseNumber = classObject.courseNum
 			url = classObject.coursePageLink
 		except AttributeError:
 			return
 
-		response = requests.post(url)
-		soup = BeautifulSoup(response.content, "html.parser")
+		corecCourseNums = self.corecCourseNumsCache.get(url)
+		if corecCourseNums is None:
+			Metrics.increment("cache.corecCourseNums.misses")
+			if coursePage is None:
+				coursePage = self._fetchCoursePage(url)
+			with Metrics.timer("classSearch.parseCoursePage"):
+				corecCourseNums = NDClassSearchParser.__parseCorecCourseNumbers(coursePage)
+			self.corecCourseNumsCache[url] = corecCourseNums
+		else:
+			Metrics.increment("cache.corecCourseNums.hits")
 
-		spans = soup.find('table', {'class':'datadisplaytable'}).find('td').findAll('span', {'class', 'fieldlabeltext'})
-		for tag in spans:
-			if tag.text == "Corequisites:":
-				data = soup.find('table', {'class':'datadisplaytable'}).find('td').text
+		if corecCourseNums:
+			classObject.corecs = self.__getCorecList(corecCourseNums)
+			NDClassSearchParser.logger.info("Retrieved info for corecs of {}...".format(courseNumber))
+
+	# Helper function to return a tuple of the (normalized) course numbers listed as corequisites on a course page
+	@staticmethod
+	def __parseCorecCourseNumbers(coursePage):
+		details = ClassSearchHTML.parseCourseDetails(coursePage)
+		if details is None:
+			return ()
+
+		labels, data = details
+		for label in labels:
+			if label == "Corequisites:":
 				pattern1 = re.compile('(Corequisites:.*?(Comments|Restrictions))', re.DOTALL)
 				corecString = pattern1.findall(data)[0]
 				pattern2 = re.compile('[a-zA-Z]{2,4} \d{5}')
@@ -118,12 +255,36 @@ class NDClassSearchParser(CoursePageParser):
 				for num in corecCourseNums:
 					num = num.replace(" ", "")
 					corecs.append(num)
+				return tuple(corecs)
+		return ()
+
+	# Helper function to return the shared SectionList holding the sections of every course in corecCourseNums
+	def __getCorecList(self, corecCourseNums):
+		try:
+			corecList = self.corecListCache[corecCourseNums]
+			Metrics.increment("cache.corecList.hits")
+			return corecList
+		except KeyError:
+			Metrics.increment("cache.corecList.misses")
+
+		corecList = SectionList()
+		for num in corecCourseNums:
+			corecList.insertSectionsForNewCourse(num, self.__getCorecSections(num))
+		self.corecListCache[corecCourseNums] = corecList
+		return corecList
 
-				corecInfo = []
-				for num in corecs:
-					classObject.corecs.insertSectionsForNewCourse(num, self.getAllSectionsForCourse(num, addCorecs=False))
-				NDClassSearchParser.logger.info("Retrieved info for corecs of {}...".format(courseNumber))
-				return corecInfo
+	# Helper function to return a tuple of the sections of a corec, which is shared by every section that lists it
+	def __getCorecSections(self, courseNumberString):
+		key = (self.term, courseNumberString)
+		try:
+			sections = self.corecSectionsCache[key]
+			Metrics.increment("cache.corecSections.hits")
+			return sections
+		except KeyError:
+			Metrics.increment("cache.corecSections.misses")
+			sections = tuple(self.getAllSectionsForCourse(courseNumberString, addCorecs=False))
+			self.corecSectionsCache[key] = sections
+			return sections
 
 	#Function to get the most recent term available on ClassSearch
 	@staticmethod
@@ -138,24 +299,81 @@ class NDClassSearchParser(CoursePageParser):
 		NDClassSearchParser.logger.debug("Returning sanitized course number: {}...".format(courseNumber))
 		return courseNumber
 
-	@classmethod
-	def __getMostRecentTerm(cls):
-		response = requests.post(cls.classSearchURL)
-		soup = BeautifulSoup(response.content, "html.parser")
+	def __getMostRecentTerm(self):
+		termNums = self.getTerms()
+		NDClassSearchParser.logger.debug("Getting most recent term: {}...".format(termNums[0]))
+		return termNums[0]
+
+	#Retrieve the identifiers of every term listed on Class Search (e.g. 201620), most recent first
+	def getTerms(self):
+		with self.__requestSlots:
+			response = self.session.post(self.classSearchURL, timeout=self.requestTimeout)
+		response.raise_for_status()
+		soup = BeautifulSoup(response.content, ClassSearchHTML.HTML_PARSER)
 
-		#Find most recent term
 		options = soup.find('select', {'name':'TERM'}).findAll('option')
+		termNums = [option['value'] for option in options]
+		soup.decompose()
+		return termNums
 
-		termNums = []
-		for option in options:
-			termNums.append(option['value'])
+	# Returns a dictionary with course numbers (e.g. CSE30331) as keys, and a list of SectionRecord objects for every
+	# section of that course in the department as values
+	# Raises a ValueError when an invalid department is given
+	def _getDepartmentIndex(self, department):
+		rows = self._getClassSearchRows(department)
+
+		departmentIndex = {}
+		with Metrics.timer("classSearch.indexDepartment"):
+			for row in rows:
+				match = re.match('(\w{2,4}\d{5})', row[0])
+				if match is None:
+					continue
+				# A row that can't be parsed is skipped, so it doesn't keep the other courses in the department from
+				# being found
+				try:
+					record = self.__parseSectionRow(row)
+				except (ValueError, IndexError):
+					NDClassSearchParser.logger.exception("Skipping unexpected row for {}".format(match.group(1)))
+					Metrics.increment("classSearch.skippedRows")
+					continue
+				departmentIndex.setdefault(match.group(1), []).append(record)
+
+		NDClassSearchParser.logger.debug("Indexed {} courses in the {} department...".format(len(departmentIndex), department))
+		return departmentIndex
+
+	# Helper function to parse one row of a Class Search table (see ClassSearchHTML.parseResultRows) into a SectionRecord
+	# Raises a ValueError or an IndexError if a field of the row isn't in the expected format
+	def __parseSectionRow(self, row):
+		try:
+			classTimes = NDClassSearchParser.__getClassTimes(row[10])
+		except ValueError:
+			classTimes = {"U":UndefinedClassTime()}
+		return SectionRecord(name=row[1],
+		                     sectionNum=NDClassSearchParser.__getSectionNumber(row[0]),
+		                     crn=row[7],
+		                     profName=NDClassSearchParser.__sanitizeProf(row[9]),
+		                     classTimes=classTimes,
+		                     openSpots=int(row[5]),
+		                     totalSpots=int(row[4]),
+		                     coursePageLink=self.__extractLinkToCoursePage(row[-1]))
+
+	# Returns a list of the rows of the table from the Class Search site, as tuples of strings
+	# Raises a ValueError when an invalid department is given
+	def _getClassSearchRows(self, department):
 
-		NDClassSearchParser.logger.debug("Getting most recent term: {}...".format(termNums[0]))
-		return termNums[0]
+		# parsing data
+		content = self._fetchClassSearchPage(department)
+		with Metrics.timer("classSearch.parseDepartmentPage"):
+			rows = ClassSearchHTML.parseResultRows(content)
+		if rows is None:
+			NDClassSearchParser.logger.error("Error: invalid department: {}".format(department))
+			raise ValueError("Invalid department {}".format(department))
 
-	# Returns a BeautifulSoup object containing the table from the Class Search site
-	# Raises a ValueError when an invalid department is given
-	def _getClassSearchTable(self, department):
+		NDClassSearchParser.logger.debug("Returning Class Search table for the {} department...".format(department))
+		return rows
+
+	# Returns the raw content of the Class Search results page for a department
+	def _fetchClassSearchPage(self, department):
 
 		# parsing parameters
 		data = {
@@ -167,19 +385,17 @@ class NDClassSearchParser(CoursePageParser):
 			'CREDIT': 'A'
 		}
 
-		# parsing data
-		response = requests.post(self.classSearchURL, data=data)
-		soup = BeautifulSoup(response.content, "html.parser")
+		with self.__requestSlots, Metrics.timer("classSearch.fetchDepartmentPage"):
+			response = self.session.post(self.classSearchURL, data=data, timeout=self.requestTimeout)
+		response.raise_for_status()
+		return response.content
 
-		table = None
-		try:
-			table = soup.find('table', {'id':'resulttable'}).find('tbody')
-		except AttributeError as e:
-			NDClassSearchParser.logger.exception("Error: invalid department: ".format(department))
-			raise ValueError("Invalid department {}".format(department)) from e
-
-		NDClassSearchParser.logger.debug("Returning Class Search table for the {} department...".format(department))
-		return table
+	# Returns the raw content of the course page at url
+	def _fetchCoursePage(self, url):
+		with self.__requestSlots, Metrics.timer("classSearch.fetchCoursePage"):
+			response = self.session.post(url, timeout=self.requestTimeout)
+		response.raise_for_status()
+		return response.content
 
 	#Take the entire course number field from Class Search and parse it to obtain the section number
 	@staticmethod
@@ -247,12 +463,11 @@ class NDClassSearchParser(CoursePageParser):
 		profName = profName.replace("\n", "")
 		return profName
 
-	#Takes in the field on the main page of ClassSearch that contains the link to the class page, and returns the link
+	#Takes in the markup of the link on the main page of ClassSearch to the class page, and returns the link
 	@classmethod
-	def __extractLinkToCoursePage(cls, linkField):
-		elem = linkField.findAll('a')[0]
+	def __extractLinkToCoursePage(cls, linkMarkup):
 		pattern = re.compile("Servlet(\?[^']+)'")
-		result = pattern.findall(str(elem))[0]
+		result = pattern.findall(linkMarkup)[0]
 		result = result.replace('&amp;', '&')
 		return cls.classSearchURL + result
 
@@ -272,26 +487,170 @@ class NDClassSearchParser(CoursePageParser):
 # NDClassSearchParserWithCaching:
 # This class extends NDClassSearchParser to allow for caching of Class Search tables, allowing for faster results when
 # users are taking multiple classes within the same department
+# When a cacheDirectory is given, the pages for each department and each course page are also stored on disk, so that
+# they survive server restarts and can be shared between parsers
 # Instance variables:
-# tableCache: a dictionary with the department as the key and the BeautifulSoup object representing the
-#   Class Search table as the value
+# indexCache: a dictionary with the department as the key and the parsed index of that department's Class Search table
+#   (see _getDepartmentIndex) as the value
+# diskCache: a ClassSearchCache holding downloaded pages, or None if pages are not stored on disk
+# refreshListeners: a list of functions that are called with the term and the department whenever a department is
+#   refreshed or its data changes (see refreshDepartment and updateDepartment)
 class NDClassSearchParserWithCaching(NDClassSearchParser):
 	logger = logging.getLogger(__name__)
 	logger.setLevel(logging.DEBUG)
 
-	def __init__(self, term = None):
-		super().__init__(term=term)
-		self.tableCache = {}
-
-	def _getClassSearchTable(self, department):
+	# cacheTTL is the number of seconds for which pages stored on disk are used before they are downloaded again
+	def __init__(self, term = None, cacheDirectory = None, cacheTTL = 3600, maxConcurrentRequests = 8, requestTimeout = 30):
+		super().__init__(term=term, maxConcurrentRequests=maxConcurrentRequests, requestTimeout=requestTimeout)
+		self.indexCache = {}
+		self.diskCache = ClassSearchCache.ClassSearchCache(cacheDirectory, cacheTTL) if cacheDirectory else None
+		self.refreshListeners = []
+
+	# Drop everything cached about a department, so that its data is downloaded again the next time it is needed
+	# Every function in refreshListeners is then called with the term and the department
+	def refreshDepartment(self, department):
+		self.indexCache.pop(department, None)
+		if self.diskCache is not None:
+			self.diskCache.invalidate(self.term, "department", department)
+
+		# Corecs from the department, and the corec lists that hold them, are out of date too
+		# The caches are copied before they are searched, since other requests may be adding to them
+		for key in [key for key in list(self.corecSectionsCache)
+		            if NDClassSearchParser.getDepartment(key[1]) == department]:
+			self.corecSectionsCache.pop(key, None)
+		for key in [key for key in list(self.corecListCache)
+		            if any(NDClassSearchParser.getDepartment(num) == department for num in key)]:
+			self.corecListCache.pop(key, None)
+
+		NDClassSearchParserWithCaching.logger.info("Refreshed the {} department...".format(department))
+		for listener in self.refreshListeners:
+			listener(self.term, department)
+
+	# Download and index a department's table if it isn't cached yet, so that requests for its courses don't wait on it
+	# Raises a ValueError when an invalid department is given
+	def prefetchDepartment(self, department):
+		self._getDepartmentIndex(department)
+
+	# Download a department's table again and update what is cached about it with only the rows that changed, comparing
+	# rows by CRN
+	# Sections whose seat counts are the only change are updated in place, so corec lists holding them stay cached;
+	# corecs from courses with any other change (or with sections added or removed) are dropped from the caches
+	# Every function in refreshListeners is called with the term and the department if any row changed
+	# Returns the set of CRNs of the rows that changed, were added or were removed
+	# Raises a ValueError when an invalid department is given
+	def updateDepartment(self, department):
+		oldIndex = self.indexCache.get(department)
+		if self.diskCache is not None:
+			self.diskCache.invalidate(self.term, "department", department)
+		with Metrics.timer("classSearch.updateDepartment"):
+			newIndex = super()._getDepartmentIndex(department)
+		if oldIndex is None:
+			self.indexCache[department] = newIndex
+			return set()
+
+		# Compare the rows, keeping the old record of every row that didn't change
+		oldRows = {}
+		for courseNum in oldIndex:
+			for record in oldIndex[courseNum]:
+				oldRows[record.crn] = (courseNum, record)
+		changedCrns = set()
+		changedCourses = set()
+		seatUpdates = {}
+		updatedIndex = {}
+		for courseNum in newIndex:
+			records = updatedIndex[courseNum] = []
+			for record in newIndex[courseNum]:
+				oldCourseNum, oldRecord = oldRows.pop(record.crn, (None, None))
+				if oldCourseNum == courseNum and oldRecord == record:
+					records.append(oldRecord)
+					continue
+				changedCrns.add(record.crn)
+				records.append(record)
+				if (oldCourseNum == courseNum and
+				    oldRecord._replace(openSpots=record.openSpots, totalSpots=record.totalSpots) == record):
+					seatUpdates[record.crn] = record
+				else:
+					changedCourses.update(num for num in (courseNum, oldCourseNum) if num is not None)
+		for crn in oldRows:
+			changedCrns.add(crn)
+			changedCourses.add(oldRows[crn][0])
+		self.indexCache[department] = updatedIndex
+		Metrics.increment("classSearch.seatUpdates", len(seatUpdates))
+		Metrics.increment("classSearch.changedSections", len(changedCrns) - len(seatUpdates))
+		if not changedCrns:
+			return changedCrns
+
+		for (term, courseNum) in list(self.corecSectionsCache):
+			sections = self.corecSectionsCache.get((term, courseNum), ())
+			if courseNum in changedCourses:
+				self.corecSectionsCache.pop((term, courseNum), None)
+				for key in [key for key in list(self.corecListCache) if courseNum in key]:
+					self.corecListCache.pop(key, None)
+				continue
+			for section in sections:
+				record = seatUpdates.get(section.crn)
+				if record is not None:
+					section.openSpots = record.openSpots
+					section.totalSpots = record.totalSpots
+
+		NDClassSearchParserWithCaching.logger.info("Updated {} sections of the {} department...".format(len(changedCrns),
+		                                                                                             department))
+		for listener in self.refreshListeners:
+			listener(self.term, department)
+		return changedCrns
+
+	# Update the seat counts of sections of a department in place from its cached index, for sections built by an earlier
+	# lookup that are still held elsewhere (e.g. by a session), which updateDepartment doesn't know about
+	# Sections of other departments, and sections whose CRN isn't in the index, are left alone
+	def updateSeatCounts(self, sections, department):
+		departmentIndex = self.indexCache.get(department)
+		if departmentIndex is None:
+			return
+		records = {}
+		for courseNum in departmentIndex:
+			for record in departmentIndex[courseNum]:
+				records[record.crn] = record
+		for section in sections:
+			record = records.get(getattr(section, "crn", None))
+			if record is not None and NDClassSearchParser.getDepartment(section.courseNum) == department:
+				section.openSpots = record.openSpots
+				section.totalSpots = record.totalSpots
+
+	def _getDepartmentIndex(self, department):
 		try:
-			table = self.tableCache[department]
-			NDClassSearchParserWithCaching.logger.info("Table for {} found in cache")
+			departmentIndex = self.indexCache[department]
+			Metrics.increment("cache.departmentIndex.hits")
+			NDClassSearchParserWithCaching.logger.info("Index for {} found in cache".format(department))
 		except KeyError:
-			NDClassSearchParserWithCaching.logger.info("Table for {} not found in cache. Retrieving...")
+			Metrics.increment("cache.departmentIndex.misses")
+			NDClassSearchParserWithCaching.logger.info("Index for {} not found in cache. Retrieving...".format(department))
 			try:
-				table = super()._getClassSearchTable(department)
-				self.tableCache[department] = table
+				departmentIndex = super()._getDepartmentIndex(department)
+				self.indexCache[department] = departmentIndex
 			except ValueError:
 				raise
-		return table
+		return departmentIndex
+
+	def _fetchClassSearchPage(self, department):
+		return self.__fetchWithDiskCache("department", department, super()._fetchClassSearchPage, department,
+		                                 ClassSearchHTML.hasResultTable)
+
+	def _fetchCoursePage(self, url):
+		return self.__fetchWithDiskCache("course", url, super()._fetchCoursePage, url, ClassSearchHTML.hasCourseDetails)
+
+	# Helper function to return a page from the disk cache, or to download it with fetch(argument) and store it
+	# Downloaded pages are only stored if isComplete(content) is true, so an error page (or the page for an invalid
+	# department) is downloaded again the next time instead of being served from the cache until it expires
+	def __fetchWithDiskCache(self, kind, key, fetch, argument, isComplete):
+		if self.diskCache is None:
+			return fetch(argument)
+
+		content = self.diskCache.get(self.term, kind, key)
+		if content is None:
+			Metrics.increment("cache.disk.misses")
+			content = fetch(argument)
+			if isComplete(content):
+				self.diskCache.put(self.term, kind, key, content)
+		else:
+			Metrics.increment("cache.disk.hits")
+		return content
@@ -0,0 +1,132 @@
+# NDSnapshotParser.py
+# This module contains the NDSnapshotParser class
+
+# NDSnapshotParser:
+# This class serves sections from a term snapshot file (see NDTermSnapshot) instead of Class Search, so it never uses
+# the network
+# The file is memory mapped rather than read, so the parser is ready as soon as it is created, only the pages that are
+# used are loaded, and every process that opens the same file shares one copy of it
+# Instance variables:
+# term: the term of the snapshot
+# path: the path of the snapshot file
+# corecListCache: a dictionary with a tuple of corec course numbers as the key and the SectionList shared by every
+#   section with those corecs as the value
+
+from array import array
+import mmap
+from . import NDClass, NDTermSnapshot
+from src.class_scheduler import CoursePageParser, ClassTime, UndefinedClassTime, SectionList
+import logging
+
+class NDSnapshotParser(CoursePageParser):
+	logger = logging.getLogger(__name__)
+	logger.setLevel(logging.DEBUG)
+
+	# Constructor for NDSnapshotParser
+	# Raises a ValueError if the file is not a snapshot that can be read
+	def __init__(self, path):
+		NDSnapshotParser.logger.info("Opening term snapshot {}...".format(path))
+		self.path = path
+		with open(path, "rb") as snapshotFile:
+			self.__mmap = mmap.mmap(snapshotFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+		header, start = NDTermSnapshot.readHeader(self.__mmap)
+		self.term = header["term"]
+		self.__days = header["days"]
+		self.__buffer = memoryview(self.__mmap)
+		self.__columns = {}
+		for name in header["columns"]:
+			offset, typecode, length = header["columns"][name]
+			itemsize = array(typecode).itemsize
+			self.__columns[name] = self.__buffer[start + offset:start + offset + length * itemsize].cast(typecode)
+		self.corecListCache = {}
+
+	# Accepts a course number, and returns a list of NDClass objects representing every section of the course
+	# Raises a ValueError when the course can't be found in the snapshot
+	def getAllSectionsForCourse(self, courseNumberString, addCorecs=True):
+		courseNumberString = courseNumberString.strip().replace(" ", "").upper()
+		course = self.__findCourse(courseNumberString)
+		if course is None:
+			raise ValueError("Course {} not found".format(courseNumberString))
+
+		columns = self.__columns
+		start = columns["courseSectionStart"][course]
+		sections = []
+		for row in range(start, start + columns["courseSectionCount"][course]):
+			newClass = NDClass.NDClass(self.__getString(columns["sectionName"][row]), courseNumberString,
+			                           self.__getString(columns["sectionNum"][row]), self.__getClassTimes(row),
+			                           self.__getString(columns["sectionCrn"][row]),
+			                           self.__getString(columns["sectionProf"][row]), columns["sectionOpenSpots"][row],
+			                           columns["sectionTotalSpots"][row], self.__getString(columns["sectionLink"][row]))
+			if addCorecs:
+				corecStart = columns["sectionCorecStart"][row]
+				corecCourseNums = tuple(self.__getString(columns["corecCourses"][corec])
+				                        for corec in range(corecStart, corecStart + columns["sectionCorecCount"][row]))
+				if corecCourseNums:
+					newClass.corecs = self.__getCorecList(corecCourseNums)
+			sections.append(newClass)
+
+		NDSnapshotParser.logger.info("Returning all sections for {}...".format(courseNumberString))
+		return sections
+
+	# Function to release the memory map of the snapshot file
+	def close(self):
+		for name in self.__columns:
+			self.__columns[name].release()
+		self.__columns = {}
+		self.__buffer.release()
+		self.__mmap.close()
+
+	# Helper function to return the row of a course in the course columns, or None if it isn't in the snapshot
+	# The course columns are sorted by course number, so this is a binary search
+	def __findCourse(self, courseNumberString):
+		courseNums = self.__columns["courseNums"]
+		low = 0
+		high = len(courseNums)
+		while low < high:
+			middle = (low + high) // 2
+			if self.__getString(courseNums[middle]) < courseNumberString:
+				low = middle + 1
+			else:
+				high = middle
+		if low < len(courseNums) and self.__getString(courseNums[low]) == courseNumberString:
+			return low
+		return None
+
+	# Helper function to return the string with the given id from the string columns
+	def __getString(self, stringId):
+		offsets = self.__columns["stringOffsets"]
+		return bytes(self.__columns["stringData"][offsets[stringId]:offsets[stringId + 1]]).decode("utf-8")
+
+	# Helper function to build the dictionary of ClassTime objects for a row in the section columns
+	def __getClassTimes(self, row):
+		columns = self.__columns
+		start = columns["sectionTimeStart"][row]
+		classTimes = {}
+		for meeting in range(start, start + columns["sectionTimeCount"][row]):
+			startMinute = columns["timeStartMinute"][meeting]
+			endMinute = columns["timeEndMinute"][meeting]
+			classTime = ClassTime(startMinute // 60, startMinute % 60, endMinute // 60, endMinute % 60)
+			for (position, day) in enumerate(self.__days):
+				if (columns["timeDays"][meeting] >> position) & 1:
+					classTimes[day] = classTime
+		if not classTimes:
+			classTimes = {"U":UndefinedClassTime()}
+		return classTimes
+
+	# Helper function to return the shared SectionList holding the sections of every course in corecCourseNums
+	# Corecs that aren't in the snapshot are left out
+	def __getCorecList(self, corecCourseNums):
+		try:
+			return self.corecListCache[corecCourseNums]
+		except KeyError:
+			pass
+
+		corecList = SectionList()
+		for num in corecCourseNums:
+			try:
+				corecList.insertSectionsForNewCourse(num, self.getAllSectionsForCourse(num, addCorecs=False))
+			except ValueError:
+				NDSnapshotParser.logger.error("Corec {} not found in snapshot".format(num))
+		self.corecListCache[corecCourseNums] = corecList
+		return corecList
@@ -0,0 +1,207 @@
+# NDTermSnapshot.py
+# This module writes and reads snapshot files, which hold every section offered at Notre Dame during one term, so that
+# schedules can be built without contacting Class Search (see NDSnapshotParser)
+# It can also be run as a command to crawl Class Search and write a snapshot:
+#   python -m src.school_extensions.UniversityOfNotreDame.NDTermSnapshot <term> <output file>
+
+# Snapshot file format (version 1):
+# The file starts with MAGIC, a 2 byte version number and a 4 byte header length (both little endian), followed by a
+# JSON header and the columns listed in the header, each aligned to 8 bytes
+# The header holds the term, the byte order of the columns, the day letters used by the time day masks, and the offset,
+# array typecode and length of every column
+# Columns:
+# stringOffsets, stringData: every string in the file, as UTF-8; string i is stringData[stringOffsets[i]:stringOffsets[i+1]]
+# courseNums, courseSectionStart, courseSectionCount: one row per course, sorted by course number (a string id), with
+#   the range of rows in the section columns for that course
+# sectionName, sectionNum, sectionCrn, sectionProf, sectionLink: string ids of each section's fields
+# sectionOpenSpots, sectionTotalSpots: seat counts for each section
+# sectionTimeStart, sectionTimeCount: the range of rows in the time columns for each section (no rows means TBA)
+# sectionCorecStart, sectionCorecCount: the range of rows in corecCourses for each section
+# timeDays: a bitmask of the days a meeting takes place on (bit i is the ith letter of the header's days string)
+# timeStartMinute, timeEndMinute: minutes after midnight at which the meeting starts and ends
+# corecCourses: string ids of the course numbers of each section's corecs (the corequisite adjacency list)
+
+from array import array
+from . import NDClassSearchParser
+import json
+import struct
+import sys
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+MAGIC = b"NDSNAP"
+VERSION = 1
+
+# Column names with their array typecodes, in the order they are written
+COLUMNS = [
+	("stringOffsets", "I"), ("stringData", "B"),
+	("courseNums", "I"), ("courseSectionStart", "I"), ("courseSectionCount", "I"),
+	("sectionName", "I"), ("sectionNum", "I"), ("sectionCrn", "I"), ("sectionProf", "I"), ("sectionLink", "I"),
+	("sectionOpenSpots", "i"), ("sectionTotalSpots", "i"),
+	("sectionTimeStart", "I"), ("sectionTimeCount", "H"), ("sectionCorecStart", "I"), ("sectionCorecCount", "H"),
+	("timeDays", "B"), ("timeStartMinute", "H"), ("timeEndMinute", "H"),
+	("corecCourses", "I"),
+]
+
+# Function to write a snapshot file
+# term: the term the sections belong to
+# courses: a dictionary with course numbers as keys and lists of Class objects (with their corecs) as values
+# path: the path of the file to write
+def writeSnapshot(term, courses, path):
+	strings = []
+	stringIds = {}
+
+	# Helper function to return the id of a string in the string table, adding it if needed
+	def stringId(string):
+		if string not in stringIds:
+			stringIds[string] = len(strings)
+			strings.append(string)
+		return stringIds[string]
+
+	columns = {name: array(typecode) for (name, typecode) in COLUMNS}
+	days = []
+	for courseNum in sorted(courses):
+		columns["courseNums"].append(stringId(courseNum))
+		columns["courseSectionStart"].append(len(columns["sectionName"]))
+		columns["courseSectionCount"].append(len(courses[courseNum]))
+
+		for section in courses[courseNum]:
+			columns["sectionName"].append(stringId(section.name))
+			columns["sectionNum"].append(stringId(section.sectionNum))
+			columns["sectionCrn"].append(stringId(getattr(section, "crn", "")))
+			columns["sectionProf"].append(stringId(getattr(section, "profName", "")))
+			columns["sectionLink"].append(stringId(getattr(section, "coursePageLink", "")))
+			columns["sectionOpenSpots"].append(getattr(section, "openSpots", 0))
+			columns["sectionTotalSpots"].append(getattr(section, "totalSpots", 0))
+
+			# Meetings with the same start and end time share one row, with a bit set for each of their days
+			meetings = {}
+			for day in sorted(section.classTimes):
+				classTime = section.classTimes[day]
+				if classTime.neverConflict:
+					continue
+				if day not in days:
+					days.append(day)
+				startMinute = classTime.startTime.hour * 60 + classTime.startTime.minute
+				endMinute = classTime.endTime.hour * 60 + classTime.endTime.minute
+				meetings[(startMinute, endMinute)] = meetings.get((startMinute, endMinute), 0) | (1 << days.index(day))
+			columns["sectionTimeStart"].append(len(columns["timeDays"]))
+			columns["sectionTimeCount"].append(len(meetings))
+			for (startMinute, endMinute) in sorted(meetings):
+				columns["timeDays"].append(meetings[(startMinute, endMinute)])
+				columns["timeStartMinute"].append(startMinute)
+				columns["timeEndMinute"].append(endMinute)
+
+			corecCourseNums = __getCorecCourseNums(section)
+			columns["sectionCorecStart"].append(len(columns["corecCourses"]))
+			columns["sectionCorecCount"].append(len(corecCourseNums))
+			for corecCourseNum in corecCourseNums:
+				columns["corecCourses"].append(stringId(corecCourseNum))
+
+	offset = 0
+	for string in strings:
+		columns["stringOffsets"].append(offset)
+		encoded = string.encode("utf-8")
+		columns["stringData"].extend(encoded)
+		offset += len(encoded)
+	columns["stringOffsets"].append(offset)
+
+	# Lay out the columns after the header, each aligned to 8 bytes
+	header = {"term": term, "created": time.time(), "byteorder": sys.byteorder, "days": "".join(days), "columns": {}}
+	columnData = []
+	position = 0
+	for (name, typecode) in COLUMNS:
+		data = columns[name].tobytes()
+		header["columns"][name] = [position, typecode, len(columns[name])]
+		padding = (-len(data)) % 8
+		columnData.append(data + b"\0" * padding)
+		position += len(data) + padding
+
+	# The header is padded so that the columns start on an 8 byte boundary; column offsets are relative to that start
+	headerBytes = json.dumps(header).encode("utf-8")
+	prefixLength = len(MAGIC) + 6
+	headerBytes += b" " * ((-(prefixLength + len(headerBytes))) % 8)
+	with open(path, "wb") as snapshotFile:
+		snapshotFile.write(MAGIC + struct.pack("<HI", VERSION, len(headerBytes)) + headerBytes)
+		for data in columnData:
+			snapshotFile.write(data)
+
+	logger.info("Wrote snapshot of {} courses for term {} to {}...".format(len(courses), term, path))
+
+# Function to read the header of a snapshot from a buffer (e.g. an mmap of the file)
+# Returns a tuple of the header dictionary and the offset at which the columns start
+# Raises a ValueError if the buffer is not a snapshot this module can read
+def readHeader(buffer):
+	prefixLength = len(MAGIC) + 6
+	if bytes(buffer[:len(MAGIC)]) != MAGIC:
+		raise ValueError("Not a term snapshot file")
+	version, headerLength = struct.unpack("<HI", bytes(buffer[len(MAGIC):prefixLength]))
+	if version != VERSION:
+		raise ValueError("Unsupported term snapshot version {}".format(version))
+
+	header = json.loads(bytes(buffer[prefixLength:prefixLength + headerLength]).decode("utf-8"))
+	if header["byteorder"] != sys.byteorder:
+		raise ValueError("Term snapshot was written with {} endian columns".format(header["byteorder"]))
+	return (header, prefixLength + headerLength)
+
+# Function to crawl every department on Class Search for a term and write a snapshot of it
+# parser: an NDClassSearchParser for the term; a caching parser avoids downloading corec departments twice
+def crawlTerm(parser, path):
+	courses = {}
+	for department in parser.getDepartments():
+		try:
+			courseNums = sorted(parser._getDepartmentIndex(department))
+		except ValueError as e:
+			logger.error(str(e))
+			continue
+
+		logger.info("Crawling {} courses in the {} department...".format(len(courseNums), department))
+		try:
+			sectionsByCourse = parser.getAllSectionsForCourses(courseNums)
+		except ValueError as e:
+			logger.error("Skipping the {} department: {}".format(department, e))
+			continue
+		for courseNum in courseNums:
+			sections = sectionsByCourse[courseNum]
+			if isinstance(sections, ValueError):
+				logger.error(str(sections))
+				continue
+			courses[courseNum] = sections
+
+	# Corecs can come from departments that weren't listed, so make sure every corec is in the snapshot too
+	for sections in list(courses.values()):
+		for section in sections:
+			node = section.corecs.head
+			while node is not None:
+				if node.sections and node.sections[0].courseNum not in courses:
+					courses[node.sections[0].courseNum] = list(node.sections)
+				node = node.nextCourse
+
+	writeSnapshot(parser.term, courses, path)
+
+# Helper function to return the course numbers of the corecs of a section, in order
+def __getCorecCourseNums(section):
+	corecCourseNums = []
+	node = section.corecs.head
+	while node is not None:
+		if node.sections:
+			corecCourseNums.append(node.sections[0].courseNum)
+		node = node.nextCourse
+	return corecCourseNums
+
+# Function to run the bulk import from the command line
+def main(argv):
+	if len(argv) != 3:
+		print("Usage: python -m src.school_extensions.UniversityOfNotreDame.NDTermSnapshot <term> <output file>")
+		return 1
+
+	logging.basicConfig(level=logging.INFO)
+	parser = NDClassSearchParser.NDClassSearchParserWithCaching(term=argv[1])
+	crawlTerm(parser, argv[2])
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv))
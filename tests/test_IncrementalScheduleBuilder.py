@@ -0,0 +1,49 @@
+# test_IncrementalScheduleBuilder.py
+# Checks that IncrementalScheduleBuilder keeps its SectionTable from growing when courses are removed and added back,
+# using a parser that builds new section objects for every lookup, like NDClassSearchParser does
+# Run from the root of the repository with: python -m unittest discover tests
+
+import logging
+import shutil
+import tempfile
+import unittest
+from src.class_scheduler import IncrementalScheduleBuilder
+from src.benchmarks.ClassSearchFixtures import writeFixtures, FixtureClassSearchParser
+from src.benchmarks.SyntheticCatalog import SyntheticCatalog
+
+class IncrementalScheduleBuilderTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		logging.disable(logging.CRITICAL)
+
+	@classmethod
+	def tearDownClass(cls):
+		logging.disable(logging.NOTSET)
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.catalog = SyntheticCatalog(coursesPerDepartment=3, corecDensity=0.5, congestion=0.2, seed=1)
+		writeFixtures(self.catalog, self.directory)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def testAddingACourseBackReusesItsSections(self):
+		builder = IncrementalScheduleBuilder(FixtureClassSearchParser(self.directory))
+		courseNums = self.catalog.getCourseNumbers()
+		for courseNum in courseNums:
+			self.assertEqual(builder.addCourse(courseNum), [])
+		size = builder.sectionTable.size()
+		schedules = builder.getCompactSchedules()
+		self.assertTrue(schedules)
+
+		for cycle in range(5):
+			self.assertTrue(builder.removeCourse(courseNums[0]))
+			self.assertEqual(builder.addCourse(courseNums[0]), [])
+		self.assertEqual(builder.sectionTable.size(), size)
+		self.assertEqual(set(tuple(sorted(indices)) for indices in builder.getCompactSchedules()),
+		                 set(tuple(sorted(indices)) for indices in schedules))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,54 @@
+# test_NDClassSearchParser.py
+# Checks how NDClassSearchParser gathers the sections of several courses, using Class Search pages written for a
+# generated catalog (see ClassSearchFixtures)
+# Run from the root of the repository with: python -m unittest discover tests
+
+import logging
+import shutil
+import tempfile
+import unittest
+from src.class_scheduler import ScheduleBuilder
+from src.benchmarks.ClassSearchFixtures import writeFixtures, FixtureClassSearchParser
+from src.benchmarks.SyntheticCatalog import SyntheticCatalog
+
+class NDClassSearchParserTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		logging.disable(logging.CRITICAL)
+
+	@classmethod
+	def tearDownClass(cls):
+		logging.disable(logging.NOTSET)
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.catalog = SyntheticCatalog(coursesPerDepartment=3, corecDensity=0, seed=0)
+		self.courseNums = self.catalog.getCourseNumbers()
+
+		# The course page of the first course names a corec that has no sections this term
+		self.catalog.corecs[self.courseNums[0]] = ["SYN99999"]
+		writeFixtures(self.catalog, self.directory)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def testMissingCorecOnlyFailsItsCourse(self):
+		results = FixtureClassSearchParser(self.directory).getAllSectionsForCourses(self.courseNums)
+
+		self.assertIsInstance(results[self.courseNums[0]], ValueError)
+		self.assertIn("SYN99999", str(results[self.courseNums[0]]))
+		for courseNum in self.courseNums[1:]:
+			self.assertEqual(len(results[courseNum]), len(self.catalog.courses[courseNum]))
+
+	def testMissingCorecIsReportedAsAnError(self):
+		parser = FixtureClassSearchParser(self.directory)
+		(schedules, errors) = ScheduleBuilder.buildSchedules(parser, self.courseNums)
+
+		self.assertEqual(errors, ["Course SYN99999 not found"])
+		self.assertTrue(schedules)
+		for schedule in schedules:
+			self.assertEqual(sorted(section.courseNum for section in schedule.classes), self.courseNums[1:])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,82 @@
+# test_ScheduleBuilder.py
+# Checks that the faster ways of searching a SectionTable (the forward checking search, the memoized count and the
+# schedule templates) find exactly the schedules of the default search, on generated catalogs of several shapes, and
+# that constraints that leave a corec without sections are reported
+# Run from the root of the repository with: python -m unittest discover tests
+
+import logging
+import unittest
+from src.class_scheduler import ScheduleBuilder, ScheduleConstraints
+from src.benchmarks.SyntheticCatalog import SyntheticCatalog, SyntheticCoursePageParser
+
+# Catalog shapes to test, as arguments of SyntheticCatalog and the number of courses picked from each catalog
+CATALOGS = [
+	dict(courses=4, coursesPerDepartment=8, sectionsPerCourse=4, corecDensity=0.2, congestion=0.2),
+	dict(courses=3, coursesPerDepartment=8, sectionsPerCourse=8, corecDensity=0.5, congestion=0.8),
+	dict(courses=4, coursesPerDepartment=10, sectionsPerCourse=6, corecDensity=0.9, congestion=0.3),
+]
+SEEDS = range(5)
+
+class ScheduleBuilderTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		logging.disable(logging.CRITICAL)
+
+	@classmethod
+	def tearDownClass(cls):
+		logging.disable(logging.NOTSET)
+
+	# Generator that yields a description and a SectionTable for every catalog shape and seed
+	def iterTables(self):
+		for parameters in CATALOGS:
+			parameters = dict(parameters)
+			courseCount = parameters.pop("courses")
+			for seed in SEEDS:
+				catalog = SyntheticCatalog(seed=seed, **parameters)
+				courseNums = catalog.getCourseNumbers()
+				courseNums = courseNums[::max(1, len(courseNums) // courseCount)][:courseCount]
+				table = ScheduleBuilder.buildSectionTable(SyntheticCoursePageParser(catalog), courseNums, [])
+				yield ("{} seed={}".format(parameters, seed), table)
+
+	def testForwardCheckingFindsTheSameSchedules(self):
+		for (description, table) in self.iterTables():
+			with self.subTest(description):
+				schedules = list(ScheduleBuilder.iterCompactSchedules(table))
+				constrained = list(ScheduleBuilder.iterCompactSchedules(table, forwardChecking=True))
+				self.assertEqual(len(constrained), len(set(constrained)))
+				self.assertEqual(set(tuple(sorted(indices)) for indices in schedules), set(constrained))
+
+	def testCountMatchesTheSearch(self):
+		for (description, table) in self.iterTables():
+			with self.subTest(description):
+				schedules = list(ScheduleBuilder.iterCompactSchedules(table))
+				self.assertEqual(ScheduleBuilder.countCompactSchedules(table), len(schedules))
+
+	def testTemplatesExpandToTheSameSchedules(self):
+		for (description, table) in self.iterTables():
+			with self.subTest(description):
+				schedules = list(ScheduleBuilder.iterCompactSchedules(table))
+				templates = list(ScheduleBuilder.iterScheduleTemplates(table))
+				expanded = list(ScheduleBuilder.expandTemplates(templates))
+				self.assertEqual(sorted(expanded), sorted(schedules))
+				self.assertEqual(sum(ScheduleBuilder.countTemplate(template) for template in templates),
+				                 len(schedules))
+				self.assertEqual(list(ScheduleBuilder.expandTemplates(templates, len(schedules) // 2)),
+				                 expanded[len(schedules) // 2:])
+
+	def testEmptyCorecIsReported(self):
+		catalog = SyntheticCatalog(coursesPerDepartment=4, corecDensity=1, seed=0)
+		courseNum = catalog.getCourseNumbers()[0]
+		corecNum = catalog.corecs[courseNum][0]
+		catalog.courses[courseNum] = [section._replace(openSpots=5) for section in catalog.courses[courseNum]]
+		catalog.courses[corecNum] = [section._replace(openSpots=0) for section in catalog.courses[corecNum]]
+
+		errorsList = []
+		table = ScheduleBuilder.buildSectionTable(SyntheticCoursePageParser(catalog), [courseNum], errorsList,
+		                                          ScheduleConstraints(openSeatsOnly=True))
+		self.assertEqual(ScheduleBuilder.countCompactSchedules(table), 0)
+		self.assertEqual(errorsList, ["No sections of {} satisfy the constraints".format(corecNum)])
+
+if __name__ == '__main__':
+	unittest.main()